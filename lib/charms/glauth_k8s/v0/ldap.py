@@ -123,6 +123,7 @@ LDAP related information in order to connect and authenticate to the LDAP server
 """
 
 import json
+import logging
 from functools import wraps
 from string import Template
 from typing import Any, Callable, Dict, List, Literal, Optional, Tuple, Union
@@ -147,10 +148,12 @@ LIBAPI = 0
 
 # Increment this PATCH version before using `charmcraft publish-lib` or reset
 # to 0 if you are raising the major API version
-LIBPATCH = 13
+LIBPATCH = 14
 
 PYDEPS = ["pydantic"]
 
+logger = logging.getLogger(__name__)
+
 DEFAULT_RELATION_NAME = "ldap"
 BIND_ACCOUNT_SECRET_LABEL_TEMPLATE = Template("relation-$relation_id-bind-account-secret")
 
@@ -235,12 +238,18 @@ def leader_unit(func: Callable) -> Callable:
 @leader_unit
 def _update_relation_app_databag(
     ldap: Union["LdapProvider", "LdapRequirer"], relation: Relation, data: dict
-) -> None:
+) -> bool:
+    """Write the changed fields into the app databag, return whether anything was written."""
     if relation is None:
-        return
+        return False
 
+    databag = relation.data[ldap.app]
     data = {k: str(v) if v else "" for k, v in data.items()}
-    relation.data[ldap.app].update(data)
+    if not (changed := {k: v for k, v in data.items() if databag.get(k, "") != v}):
+        return False
+
+    databag.update(changed)
+    return True
 
 
 class Secret:
@@ -410,6 +419,7 @@ class LdapProvider(_LdapInterface):
         relation_name: str = DEFAULT_RELATION_NAME,
     ) -> None:
         super().__init__(charm, relation_name)
+        self.skipped_writes = 0
 
         self.framework.observe(
             self.charm.on[self._relation_name].relation_changed,
@@ -465,8 +475,22 @@ class LdapProvider(_LdapInterface):
             secret.grant(relations[0])
             data.bind_password_secret = secret.uri
 
+        # Only the leader writes the app databags, there is nothing to skip elsewhere
+        if not self.unit.is_leader():
+            return
+
+        # Unchanged data is not written again, so the requirers are not woken up
+        # by relation-changed events that carry nothing new
+        skipped = 0
         for relation in relations:
-            _update_relation_app_databag(self.charm, relation, data.model_dump())
+            if not _update_relation_app_databag(self.charm, relation, data.model_dump()):
+                skipped += 1
+
+        self.skipped_writes += skipped
+        logger.debug(
+            f"Updated the LDAP data in {len(relations) - skipped} relation(s), "
+            f"skipped writes: {skipped}"
+        )
 
 
 class LdapRequirer(_LdapInterface):
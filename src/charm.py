@@ -7,11 +7,16 @@
 """A Juju Kubernetes charmed operator for GLAuth."""
 
 import logging
+import sys
+import time
+from datetime import datetime, timezone
+from functools import cached_property
 from typing import Any, Optional
 
 from charms.data_platform_libs.v0.data_interfaces import (
     DatabaseCreatedEvent,
     DatabaseEndpointsChangedEvent,
+    DatabaseReadOnlyEndpointsChangedEvent,
     DatabaseRequires,
 )
 from charms.glauth_k8s.v0.ldap import (
@@ -19,6 +24,7 @@ from charms.glauth_k8s.v0.ldap import (
     LdapReadyEvent,
     LdapRequestedEvent,
     LdapRequirer,
+    LdapRequirerData,
 )
 from charms.glauth_utils.v0.glauth_auxiliary import AuxiliaryProvider, AuxiliaryRequestedEvent
 from charms.grafana_k8s.v0.grafana_dashboard import GrafanaDashboardProvider
@@ -38,21 +44,28 @@ from charms.traefik_k8s.v1.ingress_per_unit import (
     IngressPerUnitRevokedForUnitEvent,
 )
 from lightkube import Client
+from lightkube.resources.apps_v1 import StatefulSet
 from ops import StoredState, main
 from ops.charm import (
     CharmBase,
     ConfigChangedEvent,
     HookEvent,
     InstallEvent,
+    LeaderElectedEvent,
     PebbleReadyEvent,
+    RelationChangedEvent,
+    RelationCreatedEvent,
+    RelationDepartedEvent,
     RelationJoinedEvent,
     RemoveEvent,
     UpdateStatusEvent,
 )
-from ops.model import ActiveStatus, BlockedStatus, MaintenanceStatus
+from ops.framework import CommitEvent, EventBase
+from ops.model import ActiveStatus, BlockedStatus, MaintenanceStatus, WaitingStatus
 from ops.pebble import ChangeError
 
 from configs import (
+    BehaviorsConfig,
     ConfigFile,
     ConfigFileData,
     DatabaseConfig,
@@ -62,6 +75,7 @@ from configs import (
     pebble_layer,
 )
 from constants import (
+    CERTIFICATE_EXPIRY_WARNING_PERIOD,
     CERTIFICATES_INTEGRATION_NAME,
     CERTIFICATES_TRANSFER_INTEGRATION_NAME,
     DATABASE_INTEGRATION_NAME,
@@ -73,13 +87,18 @@ from constants import (
     LDAP_CLIENT_INTEGRATION_NAME,
     LDAPS_INGRESS_PER_UNIT_INTEGRATION_NAME,
     LOKI_API_PUSH_INTEGRATION_NAME,
+    PEER_INTEGRATION_NAME,
     PROMETHEUS_SCRAPE_INTEGRATION_NAME,
+    SERVER_CERT,
+    SERVER_KEY,
+    TEMPLATE_BYTECODE_CACHE_DIR,
     WORKLOAD_CONTAINER,
     WORKLOAD_SERVICE,
 )
-from exceptions import CertificatesError
+from exceptions import CertificatesError, ConfigUpdateTimeoutError
 from integrations import (
     AuxiliaryIntegration,
+    BindAccountRequest,
     CertificatesIntegration,
     CertificatesTransferIntegration,
     LdapIntegration,
@@ -90,10 +109,13 @@ from utils import (
     backend_integration_not_exists,
     backend_not_ready,
     block_when,
+    config_invalid,
     container_not_connected,
     database_not_ready,
+    evaluate,
     integration_not_exists,
     leader_unit,
+    reset_conditions,
     service_not_ready,
     tls_certificates_not_ready,
     wait_when,
@@ -107,18 +129,19 @@ class GLAuthCharm(CharmBase):
 
     _stored = StoredState()
     config_changed = False
+    config_digest: Optional[str] = None
 
     def __init__(self, *args: Any):
         super().__init__(*args)
         self._stored.set_default(
             config_hash=None,
+            config_fingerprint=None,
+            restart_fingerprint=None,
+            restart_required=False,
+            statefulset_template_changes=0,
         )
         self._container = self.unit.get_container(WORKLOAD_CONTAINER)
 
-        self._k8s_client = Client(field_manager=self.app.name, namespace=self.model.name)
-        self._configmap = ConfigMapResource(client=self._k8s_client, name=self.app.name)
-        self._statefulset = StatefulSetResource(client=self._k8s_client, name=self.app.name)
-
         self._db_name = f"{self.model.name}_{self.app.name}"
         self.database_requirer = DatabaseRequires(
             self,
@@ -131,7 +154,9 @@ class GLAuthCharm(CharmBase):
         #   `glauth-k8s` can only scale to one unit when integrated with
         #   `traefik-k8s`. `traefik-k8s` will become inactive if more than
         #   one `glauth-k8s` units are deployed because `traefik-k8s` attempts
-        #   to assign them all the same LoadBalancer IP address.
+        #   to assign them all the same LoadBalancer IP address. Without the
+        #   ingress, `glauth-k8s` scales out behind the load-balanced service
+        #   address or the per-unit addresses (see `ldap_address_mode`).
         self.ingress_per_unit = IngressPerUnitRequirer(
             self,
             INGRESS_PER_UNIT_INTEGRATION_NAME,
@@ -194,6 +219,7 @@ class GLAuthCharm(CharmBase):
         )
 
         self.framework.observe(self.on.install, self._on_install)
+        self.framework.observe(self.on.leader_elected, self._on_leader_elected)
         self.framework.observe(self.on.config_changed, self._on_config_changed)
         self.framework.observe(self.on.update_status, self._on_update_status)
         self.framework.observe(self.on.remove, self._on_remove)
@@ -204,6 +230,9 @@ class GLAuthCharm(CharmBase):
         self.framework.observe(
             self.database_requirer.on.endpoints_changed, self._on_database_changed
         )
+        self.framework.observe(
+            self.database_requirer.on.read_only_endpoints_changed, self._on_database_changed
+        )
         self.framework.observe(self.ingress_per_unit.on.ready_for_unit, self._on_ingress_changed)
         self.framework.observe(self.ingress_per_unit.on.revoked_for_unit, self._on_ingress_changed)
 
@@ -214,30 +243,37 @@ class GLAuthCharm(CharmBase):
             self.ldaps_ingress_per_unit.on.revoked_for_unit, self._on_ingress_changed
         )
 
+        self.framework.observe(
+            self.on[PEER_INTEGRATION_NAME].relation_created, self._on_peer_relation_created
+        )
+        self.framework.observe(
+            self.on[PEER_INTEGRATION_NAME].relation_changed, self._on_peer_config_changed
+        )
+        self.framework.observe(
+            self.on[PEER_INTEGRATION_NAME].relation_joined, self._on_peer_units_changed
+        )
+        self.framework.observe(
+            self.on[PEER_INTEGRATION_NAME].relation_departed, self._on_peer_units_changed
+        )
+
         # resource patching
         self.framework.observe(
             self.resources_patch.on.patch_failed, self._on_resource_patch_failed
         )
 
-        self.config_file = ConfigFile(
-            ConfigFileData(
-                base_dn=self.config.get("base_dn"),
-                anonymousdse_enabled=self.config.get("anonymousdse_enabled"),
-                starttls_config=StartTLSConfig.load(self.config),
-                ldaps_config=LdapsConfig.load(self.config),
-                database_config=DatabaseConfig.load(self.database_requirer),
-                ldap_servers_config=LdapServerConfig.load(self.ldap_requirer),
-            ),
-        )
-        self._ldap_integration = LdapIntegration(self)
-        self._auxiliary_integration = AuxiliaryIntegration(self)
+        self.framework.observe(self.framework.on.commit, self._on_framework_commit)
 
     def _restart_service(self, restart: bool = False) -> None:
+        reset_conditions(self)
         if restart:
+            logger.info("Restarting the GLAuth service")
             self._container.restart(WORKLOAD_SERVICE)
         elif not self._container.get_service(WORKLOAD_SERVICE).is_running():
+            logger.info("Starting the GLAuth service")
             self._container.start(WORKLOAD_SERVICE)
         else:
+            if self.config_changed:
+                logger.info("GLAuth reloads the updated configuration without a restart")
             self._container.replan()
 
     @after_config_updated
@@ -251,6 +287,7 @@ class GLAuthCharm(CharmBase):
             )
 
     @block_when(
+        config_invalid,
         backend_integration_not_exists,
         integration_not_exists(CERTIFICATES_INTEGRATION_NAME),
     )
@@ -259,25 +296,201 @@ class GLAuthCharm(CharmBase):
         backend_not_ready,
         tls_certificates_not_ready,
     )
-    def _handle_event_update(self, event: HookEvent, restart: bool = False) -> None:
+    def _handle_event_update(self, event: HookEvent) -> None:
         self._update_glauth_config()
         self._container.add_layer(WORKLOAD_CONTAINER, pebble_layer, combine=True)
 
-        self._restart_glauth_service(restart=restart or self.config_changed)
+        try:
+            self._restart_glauth_service(restart=self.restart_required)
+        except ConfigUpdateTimeoutError as err:
+            logger.warning(f"{err}, deferring the event")
+            # Forget the applied configuration so the deferred event waits again, a
+            # pending restart is kept in the stored state
+            self._stored.config_hash = self._stored.config_fingerprint = None
+            self.unit.status = WaitingStatus("Waiting for configuration to be updated")
+            event.defer()
+            return
+
+        # The pending restart has been applied, later events reload only
+        self.restart_required = False
         self.unit.status = ActiveStatus()
 
+    @cached_property
+    def _k8s_client(self) -> Client:
+        # Only the hooks talking to the K8s API pay for loading the client config
+        return Client(field_manager=self.app.name, namespace=self.model.name)
+
+    @cached_property
+    def _configmap(self) -> ConfigMapResource:
+        return ConfigMapResource(client=self._k8s_client, name=self.app.name)
+
+    @cached_property
+    def _statefulset(self) -> StatefulSetResource:
+        return StatefulSetResource(client=self._k8s_client, name=self.app.name)
+
+    @cached_property
+    def config_file(self) -> ConfigFile:
+        # Built on first use so hooks that never render the config do not pay for it
+        return ConfigFile(
+            ConfigFileData(
+                base_dn=self.config.get("base_dn"),
+                anonymousdse_enabled=self.config.get("anonymousdse_enabled"),
+                starttls_config=StartTLSConfig.load(self.config),
+                ldaps_config=LdapsConfig.load(self.config),
+                database_config=self.database_config,
+                ldap_servers_config=self.ldap_servers_config,
+                behaviors_config=BehaviorsConfig.load(self.config),
+            ),
+            template_bytecode_cache_dir=self.charm_dir / TEMPLATE_BYTECODE_CACHE_DIR,
+        )
+
+    @cached_property
+    def _ldap_integration(self) -> LdapIntegration:
+        return LdapIntegration(self)
+
+    @cached_property
+    def _auxiliary_integration(self) -> AuxiliaryIntegration:
+        return AuxiliaryIntegration(self)
+
+    @cached_property
+    def database_config(self) -> Optional[DatabaseConfig]:
+        # Relation data and secrets do not change within a dispatch, load them once
+        return DatabaseConfig.load(self.database_requirer, self.config)
+
+    @cached_property
+    def ldap_servers_config(self) -> Optional[LdapServerConfig]:
+        return LdapServerConfig.load(self.ldap_requirer)
+
     @property
     def current_config_hash(self) -> Optional[int]:
         return self._stored.config_hash
 
-    def fetch_cm(self) -> str:
-        return self._configmap.get().data["glauth.cfg"]
-
     @leader_unit
     def _update_cm(self) -> None:
-        self._configmap.patch({"glauth.cfg": self.config_file.content})
+        self._configmap.patch({
+            "glauth.cfg": self.config_file.content,
+            "glauth.cfg.digest": self.config_file.digest,
+        })
+
+    @property
+    def _peer_config(self) -> dict[str, str]:
+        if not (peer_relation := self.model.get_relation(PEER_INTEGRATION_NAME)):
+            return {}
+
+        return dict(peer_relation.data[self.app])
+
+    @leader_unit
+    def _publish_peer_config(self) -> None:
+        if not (peer_relation := self.model.get_relation(PEER_INTEGRATION_NAME)):
+            return
+
+        if self.current_config_hash is None:
+            return
+
+        config_digest = f"{self.current_config_hash:032x}"
+        peer_config = peer_relation.data[self.app]
+        if peer_config.get("config-digest") == config_digest:
+            return
+
+        peer_config.update({
+            "config-digest": config_digest,
+            "config-revision": str(int(peer_config.get("config-revision", 0)) + 1),
+            "restart-fingerprint": self._stored.restart_fingerprint or "",
+        })
+
+    @property
+    def _restart_granted(self) -> bool:
+        if not (peer_relation := self.model.get_relation(PEER_INTEGRATION_NAME)):
+            return False
+
+        return (
+            "restart-requested" in peer_relation.data[self.unit]
+            and peer_relation.data[self.app].get("restart-granted") == self.unit.name
+        )
+
+    @property
+    def restart_required(self) -> bool:
+        # Kept in the stored state, so a deferred event still restarts the service
+        return self._stored.restart_required
+
+    @restart_required.setter
+    def restart_required(self, value: bool) -> None:
+        self._stored.restart_required = value
+
+    def _request_restart(self) -> None:
+        peer_relation = self.model.get_relation(PEER_INTEGRATION_NAME)
+        if not peer_relation or not peer_relation.units:
+            self.restart_required = True
+            return
+
+        # Restart the units one at a time while the certificates rotate across the
+        # application, so the other units keep serving the LDAP sessions
+        logger.info("Requesting a rolling restart to load the rotated certificates")
+        peer_relation.data[self.unit]["restart-requested"] = datetime.now(timezone.utc).isoformat()
+        self._grant_restart()
+
+    @leader_unit
+    def _grant_restart(self) -> None:
+        if not (peer_relation := self.model.get_relation(PEER_INTEGRATION_NAME)):
+            return
+
+        requests = sorted(
+            unit.name
+            for unit in {self.unit, *peer_relation.units}
+            if "restart-requested" in peer_relation.data[unit]
+        )
+        granted = peer_relation.data[self.app].get("restart-granted")
+        if granted in requests:
+            return
+
+        if requests:
+            peer_relation.data[self.app]["restart-granted"] = requests[0]
+        elif granted:
+            del peer_relation.data[self.app]["restart-granted"]
+
+    def _handle_rolling_restart(self, event: EventBase) -> None:
+        if not self._restart_granted:
+            self._handle_event_update(event)
+            return
+
+        self.restart_required = True
+        self._handle_event_update(event)
+        if self.restart_required:
+            # The update did not go through, keep the turn until it is retried
+            return
+
+        logger.info("Restarted to load the rotated certificates, releasing the restart turn")
+        peer_relation = self.model.get_relation(PEER_INTEGRATION_NAME)
+        del peer_relation.data[self.unit]["restart-requested"]  # type: ignore[union-attr]
+        self._grant_restart()
+
+    def _follow_peer_config(self, peer_config: dict[str, str]) -> None:
+        config_hash = int(peer_config["config-digest"], 16)
+        if config_hash == self.current_config_hash:
+            return
+
+        logger.info(f"Following the leader's config revision {peer_config['config-revision']}")
+        self._stored.config_hash = config_hash
+        self.config_digest = peer_config["config-digest"]
+        self.config_changed = True
+
+        restart_fingerprint = peer_config.get("restart-fingerprint")
+        if restart_fingerprint != self._stored.restart_fingerprint:
+            self._stored.restart_fingerprint = restart_fingerprint
+            self.restart_required = True
 
     def _update_glauth_config(self) -> None:
+        # The followers reuse the config digest published by the leader instead of
+        # rendering the config themselves
+        if not self.unit.is_leader() and "config-digest" in (peer_config := self._peer_config):
+            self._follow_peer_config(peer_config)
+            return
+
+        config_fingerprint = self.config_file.fingerprint
+        if config_fingerprint == self._stored.config_fingerprint:
+            return
+
+        self._stored.config_fingerprint = config_fingerprint
         config_hash = hash(self.config_file)
         if config_hash == self.current_config_hash:
             return
@@ -285,8 +498,19 @@ class GLAuthCharm(CharmBase):
         self._update_cm()
 
         self._stored.config_hash = config_hash
+        self.config_digest = self.config_file.digest
         self.config_changed = True
 
+        # GLAuth watches its configuration file and applies the behaviors live. The
+        # listeners, TLS settings and backends are still applied with a restart, since
+        # nothing verifies the watcher rebuilds the backends over a ConfigMap mount
+        restart_fingerprint = self.config_file.restart_fingerprint
+        if restart_fingerprint != self._stored.restart_fingerprint:
+            self._stored.restart_fingerprint = restart_fingerprint
+            self.restart_required = True
+
+        self._publish_peer_config()
+
     @leader_unit
     def _mount_glauth_config(self) -> None:
         pod_spec_patch = {
@@ -309,8 +533,41 @@ class GLAuthCharm(CharmBase):
                 },
             ],
         }
+        if self._glauth_config_mounted():
+            logger.debug("The GLAuth config is already mounted, skip patching the StatefulSet")
+            return
+
         patch_data = {"spec": {"template": {"spec": pod_spec_patch}}}
-        self._statefulset.patch(patch_data)
+        if not self._statefulset.patch(patch_data):
+            return
+
+        # Every pod template change rolls the StatefulSet and restarts the GLAuth pods
+        self._stored.statefulset_template_changes += 1
+        logger.info(
+            f"Patched the StatefulSet pod template, "
+            f"{self._stored.statefulset_template_changes} change(s) made by the charm"
+        )
+
+    def _glauth_config_mounted(self) -> bool:
+        statefulset: Optional[StatefulSet] = self._statefulset.get()
+        if not statefulset or not statefulset.spec or not statefulset.spec.template.spec:
+            return False
+
+        pod_spec = statefulset.spec.template.spec
+        volume_exists = any(
+            volume.name == "glauth-config"
+            and volume.configMap
+            and volume.configMap.name == self._configmap.name
+            for volume in pod_spec.volumes or []
+        )
+        mount_exists = any(
+            volume_mount.name == "glauth-config"
+            and volume_mount.mountPath == str(GLAUTH_CONFIG_DIR)
+            for container in pod_spec.containers
+            if container.name == WORKLOAD_CONTAINER
+            for volume_mount in container.volumeMounts or []
+        )
+        return volume_exists and mount_exists
 
     @leader_unit
     def _on_install(self, event: InstallEvent) -> None:
@@ -328,7 +585,9 @@ class GLAuthCharm(CharmBase):
             data=self._auxiliary_integration.auxiliary_data,
         )
 
-    def _on_database_changed(self, event: DatabaseEndpointsChangedEvent) -> None:
+    def _on_database_changed(
+        self, event: DatabaseEndpointsChangedEvent | DatabaseReadOnlyEndpointsChangedEvent
+    ) -> None:
         self.unit.status = MaintenanceStatus("Configuring resources")
         self._handle_event_update(event)
         self.auxiliary_provider.update_relation_app_data(
@@ -336,7 +595,31 @@ class GLAuthCharm(CharmBase):
         )
 
     def _on_update_status(self, event: UpdateStatusEvent) -> None:
-        self._handle_event_update(event)
+        start = time.monotonic()
+        self._check_certificate_expiry()
+
+        if drift := self._detect_drift():
+            logger.info(f"Reconciling the charm on update-status: {drift}")
+            self._handle_event_update(event)
+            path = "reconcile"
+        else:
+            path = "health check"
+
+        logger.debug(f"The update-status {path} took {time.monotonic() - start:.3f} seconds")
+
+    def _detect_drift(self) -> Optional[str]:
+        if not isinstance(self.unit.status, ActiveStatus):
+            return f"the unit status is {self.unit.status.name}"
+
+        service_not_running, msg = evaluate(self, service_not_ready)
+        return msg if service_not_running else None
+
+    def _check_certificate_expiry(self) -> None:
+        if not (expiry_time := self._certs_integration.cert_expiry_time):
+            return
+
+        if expiry_time - datetime.now(timezone.utc) < CERTIFICATE_EXPIRY_WARNING_PERIOD:
+            logger.warning(f"The TLS certificate expires at {expiry_time.isoformat()}")
 
     def _on_config_changed(self, event: ConfigChangedEvent) -> None:
         self.unit.status = MaintenanceStatus("Configuring resources")
@@ -352,6 +635,7 @@ class GLAuthCharm(CharmBase):
     def __on_pebble_ready(self, event: PebbleReadyEvent) -> None:
         try:
             self._certs_integration.update_certificates()
+            reset_conditions(self)
         except CertificatesError:
             self.unit.status = BlockedStatus(
                 "Failed to update the TLS certificates, please check the logs"
@@ -360,6 +644,11 @@ class GLAuthCharm(CharmBase):
 
         self._handle_event_update(event)
 
+    def _on_framework_commit(self, event: CommitEvent) -> None:
+        # SQLAlchemy is only imported by the hooks that provision bind accounts
+        if database := sys.modules.get("database"):
+            database.engine_registry.dispose()
+
     def _on_resource_patch_failed(self, event: K8sResourcePatchFailedEvent) -> None:
         logger.error(f"Failed to patch resource constraints: {event.message}")
         self.unit.status = BlockedStatus(event.message)
@@ -382,6 +671,26 @@ class GLAuthCharm(CharmBase):
             relation_id=event.relation.id,
         )
 
+    @leader_unit
+    def _on_leader_elected(self, event: LeaderElectedEvent) -> None:
+        if not self.ldap_provider.relations:
+            return
+
+        self._reconcile_bind_accounts(event)
+
+    @wait_when(backend_not_ready, service_not_ready)
+    def _reconcile_bind_accounts(self, event: LeaderElectedEvent) -> None:
+        requests = [
+            BindAccountRequest(requirer_data.user, requirer_data.group, relation.id)
+            for relation in self.ldap_provider.relations
+            if (relation_data := relation.data.get(relation.app))
+            and (requirer_data := LdapRequirerData(**relation_data))
+        ]
+
+        provider_data = self._ldap_integration.load_bind_accounts(requests)
+        for relation_id, data in provider_data.items():
+            self.ldap_provider.update_relations_app_data(data, relation_id=relation_id)
+
     def _on_ldap_ready(self, event: LdapReadyEvent) -> None:
         self._handle_event_update(event)
 
@@ -392,6 +701,22 @@ class GLAuthCharm(CharmBase):
             data=self._auxiliary_integration.auxiliary_data,
         )
 
+    def _on_peer_relation_created(self, event: RelationCreatedEvent) -> None:
+        self._publish_peer_config()
+
+    def _on_peer_config_changed(self, event: RelationChangedEvent) -> None:
+        self._grant_restart()
+        if self.unit.is_leader() and not self._restart_granted:
+            return
+
+        self._handle_rolling_restart(event)
+
+    @leader_unit
+    def _on_peer_units_changed(self, event: RelationJoinedEvent | RelationDepartedEvent) -> None:
+        self.ldap_provider.update_relations_app_data(self._ldap_integration.provider_base_data)
+        # Hand the restart turn over if its holder has departed
+        self._grant_restart()
+
     @leader_unit
     @wait_when(container_not_connected)
     def _on_ingress_changed(
@@ -402,14 +727,21 @@ class GLAuthCharm(CharmBase):
     @wait_when(container_not_connected)
     def _on_cert_changed(self, event: CertificateAvailableEvent) -> None:
         try:
+            # GLAuth only loads the server key and certificate when it starts. The
+            # restart is requested before the push, as a retried event finds the
+            # pushed files up to date
+            if {SERVER_KEY, SERVER_CERT} & self._certs_integration.stale_certificates():
+                self._request_restart()
+
             self._certs_integration.update_certificates()
+            reset_conditions(self)
         except CertificatesError:
             self.unit.status = BlockedStatus(
                 "Failed to update the TLS certificates, please check the logs"
             )
             return
 
-        self._handle_event_update(event, restart=True)
+        self._handle_rolling_restart(event)
         self._certs_transfer_integration.transfer_certificates(
             self._certs_integration.cert_data,
         )
@@ -2,22 +2,58 @@
 # See LICENSE file for licensing details.
 
 import hashlib
-from dataclasses import asdict, dataclass
+import json
+import logging
+from dataclasses import asdict, dataclass, field, is_dataclass
 from pathlib import Path
-from typing import Any, Mapping, Optional
+from typing import TYPE_CHECKING, Any, Mapping, Optional
 
 from charms.glauth_k8s.v0.ldap import LdapProviderData, LdapRequirer
-from jinja2 import Template
 from ops.pebble import Layer
+from pydantic import BaseModel
 
 from constants import (
     GLAUTH_COMMANDS,
+    GLAUTH_CONFIG_TEMPLATE,
     POSTGRESQL_DSN_TEMPLATE,
     SERVER_CERT,
     SERVER_KEY,
     WORKLOAD_SERVICE,
 )
 
+if TYPE_CHECKING:
+    from jinja2 import Template
+
+logger = logging.getLogger(__name__)
+
+_templates: dict[tuple[str, int], "Template"] = {}
+
+
+def load_template(path: Path, bytecode_cache_dir: Optional[Path] = None) -> "Template":
+    """Load a compiled template, reusing it until the template file changes."""
+    key = (str(path), path.stat().st_mtime_ns)
+    if template := _templates.get(key):
+        return template
+
+    # jinja2 is only needed when rendering, keep it off the hook startup path
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+    bytecode_cache = None
+    if bytecode_cache_dir:
+        try:
+            bytecode_cache_dir.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(bytecode_cache_dir))
+        except OSError as e:
+            logger.warning(f"Template bytecode cache is disabled: {e}")
+
+    env = Environment(loader=FileSystemLoader(path.parent), bytecode_cache=bytecode_cache)
+    template = env.get_template(path.name)
+
+    for cached in [cached for cached in _templates if cached[0] == key[0]]:
+        del _templates[cached]
+    _templates[key] = template
+    return template
+
 
 @dataclass
 class DatabaseConfig:
@@ -25,44 +61,101 @@ class DatabaseConfig:
     database: Optional[str] = None
     username: Optional[str] = None
     password: Optional[str] = None
+    connect_timeout: Optional[int] = None
+    read_endpoint: Optional[str] = None
 
     @property
     def dsn(self) -> str:
-        return POSTGRESQL_DSN_TEMPLATE.substitute(
+        dsn = POSTGRESQL_DSN_TEMPLATE.substitute(
             username=self.username,
             password=self.password,
             endpoint=self.endpoint,
             database=self.database,
         )
+        return f"{dsn}?connect_timeout={self.connect_timeout}" if self.connect_timeout else dsn
 
     @classmethod
-    def load(cls, requirer: Any) -> Optional["DatabaseConfig"]:
+    def load(
+        cls, requirer: Any, config: Optional[Mapping[str, Any]] = None
+    ) -> Optional["DatabaseConfig"]:
         if not (database_integrations := requirer.relations):
             return None
 
         integration_id = database_integrations[0].id
         integration_data = requirer.fetch_relation_data()[integration_id]
+        config = config or {}
+
+        endpoint = integration_data.get("endpoints")
+        read_endpoint = endpoint
+        if config.get("database_read_replicas_enabled") and (
+            read_only_endpoints := integration_data.get("read-only-endpoints")
+        ):
+            # Every pod mounts the same rendered config, so it must not depend on the
+            # unit. postgresql-k8s publishes its `-replicas` service, which balances
+            # the connections across the replicas
+            read_endpoint = read_only_endpoints.split(",")[0].strip()
 
         return DatabaseConfig(
-            endpoint=integration_data.get("endpoints"),
+            endpoint=endpoint,
             database=requirer.database,
             username=integration_data.get("username"),
             password=integration_data.get("password"),
+            connect_timeout=config.get("database_connect_timeout"),
+            read_endpoint=read_endpoint,
         )
 
+    @staticmethod
+    def validate(config: Mapping[str, Any]) -> Optional[str]:
+        connect_timeout = config.get("database_connect_timeout")
+        if connect_timeout is not None and connect_timeout <= 0:
+            return "Invalid database config: database_connect_timeout must be positive"
+
+        return None
+
 
 @dataclass
 class LdapServerConfig:
-    ldap_server: Optional[LdapProviderData] = None
+    ldap_servers: list[LdapProviderData] = field(default_factory=list)
+
+    @property
+    def ldap_server(self) -> Optional[LdapProviderData]:
+        return self.ldap_servers[0] if self.ldap_servers else None
+
+    @property
+    def urls(self) -> list[str]:
+        # GLAuth pings every server of the backend, picks the least-latency one
+        # and fails over to the others
+        return list(dict.fromkeys(url for server in self.ldap_servers for url in server.urls))
 
     @classmethod
     def load(cls, requirer: LdapRequirer) -> Optional["LdapServerConfig"]:
-        ldap_servers = requirer.consume_ldap_relation_data()
+        ldap_servers = [
+            ldap_server
+            for relation in sorted(requirer.relations, key=lambda relation: relation.id)
+            if (ldap_server := requirer.consume_ldap_relation_data(relation=relation))
+        ]
 
         if not ldap_servers:
             return None
 
-        return LdapServerConfig(ldap_servers)
+        # The clients bind with the account of the first upstream, GLAuth can only fail
+        # over to the upstreams serving the same directory with the same account
+        primary, *others = ldap_servers
+        pooled = [primary]
+        for ldap_server in others:
+            if (ldap_server.base_dn, ldap_server.bind_dn, ldap_server.bind_password) != (
+                primary.base_dn,
+                primary.bind_dn,
+                primary.bind_password,
+            ):
+                logger.warning(
+                    f"Ignore the LDAP servers {ldap_server.urls}, they do not share "
+                    f"the directory and the bind account of {primary.urls}"
+                )
+                continue
+            pooled.append(ldap_server)
+
+        return LdapServerConfig(pooled)
 
 
 @dataclass
@@ -91,6 +184,62 @@ class LdapsConfig:
         )
 
 
+BEHAVIORS_OPTIONS = {
+    "failed_binds_limit_enabled": "limit_failed_binds",
+    "failed_binds_max": "number_of_failed_binds",
+    "failed_binds_period": "period_of_failed_binds",
+    "failed_binds_block_duration": "block_failed_binds_for",
+    "source_table_prune_interval": "prune_source_table_every",
+    "source_table_max_age": "prune_sources_older_than",
+}
+
+BEHAVIORS_PRESETS: dict[str, dict[str, Any]] = {
+    "default": {},
+    "high-throughput": {
+        "number_of_failed_binds": 10,
+        "block_failed_binds_for": 30,
+        "prune_source_table_every": 60,
+        "prune_sources_older_than": 120,
+    },
+}
+
+
+@dataclass
+class BehaviorsConfig:
+    limit_failed_binds: bool = True
+    number_of_failed_binds: int = 3
+    period_of_failed_binds: int = 10
+    block_failed_binds_for: int = 60
+    prune_source_table_every: int = 600
+    prune_sources_older_than: int = 600
+
+    @classmethod
+    def load(cls, config: Mapping[str, Any]) -> "BehaviorsConfig":
+        preset = BEHAVIORS_PRESETS.get(config.get("behaviors_preset", "default"), {})
+        options = {
+            name: value
+            for option, name in BEHAVIORS_OPTIONS.items()
+            if (value := config.get(option)) is not None
+        }
+        return BehaviorsConfig(**{**preset, **options})
+
+    @staticmethod
+    def validate(config: Mapping[str, Any]) -> Optional[str]:
+        if (preset := config.get("behaviors_preset", "default")) not in BEHAVIORS_PRESETS:
+            return f"Invalid behaviors preset '{preset}'"
+
+        behaviors = BehaviorsConfig.load(config)
+        for option, name in BEHAVIORS_OPTIONS.items():
+            value = getattr(behaviors, name)
+            if not isinstance(value, bool) and value <= 0:
+                return f"Invalid behaviors config: {option} must be positive"
+
+        if behaviors.prune_sources_older_than < behaviors.period_of_failed_binds:
+            return "Invalid behaviors config: source_table_max_age is shorter than failed_binds_period"
+
+        return None
+
+
 @dataclass(frozen=True)
 class ConfigFileData:
     base_dn: Optional[str] = None
@@ -99,11 +248,30 @@ class ConfigFileData:
     starttls_config: Optional[StartTLSConfig] = None
     ldaps_config: Optional[LdapsConfig] = None
     ldap_servers_config: Optional[LdapServerConfig] = None
+    behaviors_config: BehaviorsConfig = field(default_factory=BehaviorsConfig)
+
+
+def _serialize(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return dict(obj)
+    if is_dataclass(obj):
+        return asdict(obj)  # type: ignore[arg-type]
+    return str(obj)
+
+
+def _digest(inputs: Mapping[str, Any]) -> str:
+    serialized = json.dumps(inputs, sort_keys=True, default=_serialize)
+    return hashlib.md5(serialized.encode()).hexdigest()
 
 
 class ConfigFile:
-    def __init__(self, config_file: ConfigFileData) -> None:
+    def __init__(
+        self,
+        config_file: ConfigFileData,
+        template_bytecode_cache_dir: Optional[Path] = None,
+    ) -> None:
         self._config_file = config_file
+        self._template_bytecode_cache_dir = template_bytecode_cache_dir
         self._content: str = ""
 
     @property
@@ -113,15 +281,18 @@ class ConfigFile:
         return self._content
 
     def render(self) -> str:
-        with open("templates/glauth.cfg.j2", mode="r") as file:
-            template = Template(file.read())
+        template = load_template(GLAUTH_CONFIG_TEMPLATE, self._template_bytecode_cache_dir)
 
         database_config = (
             asdict(self._config_file.database_config)
             if self._config_file.database_config
             else None
         )
-        ldap_servers_config = self._config_file.ldap_servers_config
+        ldap_servers_config = (
+            self._config_file.ldap_servers_config.urls
+            if self._config_file.ldap_servers_config
+            else None
+        )
         starttls_config = (
             asdict(self._config_file.starttls_config)
             if self._config_file.starttls_config
@@ -137,12 +308,37 @@ class ConfigFile:
             ldap_servers=ldap_servers_config,
             starttls=starttls_config,
             ldaps=ldaps_config,
+            behaviors=asdict(self._config_file.behaviors_config),
         )
 
+    @property
+    def fingerprint(self) -> str:
+        """A digest of the template inputs, computed without rendering the template."""
+        return _digest({
+            "template": GLAUTH_CONFIG_TEMPLATE.stat().st_mtime_ns,
+            "data": asdict(self._config_file),
+        })
+
+    @property
+    def restart_fingerprint(self) -> str:
+        """A digest of the listener, TLS and backend inputs, which require a restart."""
+        return _digest({
+            "starttls": self._config_file.starttls_config,
+            "ldaps": self._config_file.ldaps_config,
+            "base_dn": self._config_file.base_dn,
+            "anonymousdse_enabled": self._config_file.anonymousdse_enabled,
+            "database": self._config_file.database_config,
+            "ldap_servers": self._config_file.ldap_servers_config,
+        })
+
+    @property
+    def digest(self) -> str:
+        return hashlib.md5(self.content.encode()).hexdigest()
+
     def __hash__(self) -> int:
         # Do not use the builtin `hash` function, the salt changes on every interpreter
         # run making it useless in charms
-        return int(hashlib.md5(self.content.encode()).hexdigest(), 16)
+        return int(self.digest, 16)
 
 
 pebble_layer = Layer({
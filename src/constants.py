@@ -1,6 +1,7 @@
 # Copyright 2023 Canonical Ltd.
 # See LICENSE file for licensing details.
 
+from datetime import timedelta
 from pathlib import Path, PurePath
 from string import Template
 
@@ -13,12 +14,20 @@ PROMETHEUS_SCRAPE_INTEGRATION_NAME = "metrics-endpoint"
 GRAFANA_DASHBOARD_INTEGRATION_NAME = "grafana-dashboard"
 CERTIFICATES_INTEGRATION_NAME = "certificates"
 CERTIFICATES_TRANSFER_INTEGRATION_NAME = "send-ca-cert"
+PEER_INTEGRATION_NAME = "glauth-peers"
 
 GLAUTH_CONFIG_DIR = PurePath("/etc/config")
 GLAUTH_CONFIG_FILE = GLAUTH_CONFIG_DIR / "glauth.cfg"
+GLAUTH_CONFIG_DIGEST_FILE = GLAUTH_CONFIG_DIR / "glauth.cfg.digest"
+# The kubelet syncs the mounted ConfigMaps every minute plus its cache TTL
+GLAUTH_CONFIG_UPDATE_TIMEOUT = 90
 GLAUTH_COMMANDS = f"glauth -c {GLAUTH_CONFIG_FILE}"
+GLAUTH_CONFIG_TEMPLATE = Path("templates/glauth.cfg.j2")
 GLAUTH_LDAP_PORT = 3893
 GLAUTH_LDAPS_PORT = 3894
+LDAP_ADDRESS_MODES = ("service", "unit")
+
+TEMPLATE_BYTECODE_CACHE_DIR = ".jinja2-cache"
 
 WORKLOAD_CONTAINER = "glauth"
 WORKLOAD_SERVICE = "glauth"
@@ -31,6 +40,9 @@ CERTIFICATE_FILE = Path("/etc/ssl/certs/ca-certificates.crt")
 PRIVATE_KEY_DIR = Path("/etc/ssl/private")
 LOCAL_CA_CERTS_DIR = Path("/usr/local/share/ca-certificates")
 
+CERTIFICATE_EXPIRY_WARNING_PERIOD = timedelta(days=1)
+
 SERVER_CA_CERT = LOCAL_CA_CERTS_DIR / "glauth-ca.crt"
 SERVER_KEY = PRIVATE_KEY_DIR / "glauth-server.key"
 SERVER_CERT = LOCAL_CA_CERTS_DIR / "glauth-server.crt"
+CERTIFICATES_DIGEST_FILE = PRIVATE_KEY_DIR / "glauth-certs.digest"
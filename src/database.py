@@ -2,14 +2,56 @@
 # See LICENSE file for licensing details.
 
 import logging
-from typing import Any, Optional, Type
-
-from sqlalchemy import ColumnExpressionArgument, Integer, String, create_engine, select
+from typing import Any, Optional, Sequence, Type
+
+from sqlalchemy import (
+    ColumnExpressionArgument,
+    Engine,
+    Integer,
+    String,
+    create_engine,
+    insert,
+    select,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
 
 logger = logging.getLogger(__name__)
 
 
+class EngineRegistry:
+    """Share one pooled engine per DSN across the database operations of a hook."""
+
+    def __init__(self) -> None:
+        self._engines: dict[str, Engine] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, dsn: str) -> Engine:
+        if engine := self._engines.get(dsn):
+            self.hits += 1
+            return engine
+
+        self.misses += 1
+        engine = create_engine(dsn, pool_pre_ping=True)
+        self._engines[dsn] = engine
+        return engine
+
+    def dispose(self) -> None:
+        if self._engines:
+            logger.debug(
+                f"Disposing {len(self._engines)} database engine(s), "
+                f"pool hits: {self.hits}, pool misses: {self.misses}"
+            )
+
+        for engine in self._engines.values():
+            engine.dispose()
+        self._engines.clear()
+        self.hits = self.misses = 0
+
+
+engine_registry = EngineRegistry()
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -48,8 +90,7 @@ class Operation:
         self._dsn = dsn
 
     def __enter__(self) -> "Operation":
-        engine = create_engine(self._dsn)
-        self._session = Session(engine)
+        self._session = Session(engine_registry.get(self._dsn))
         return self
 
     def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
@@ -66,5 +107,14 @@ class Operation:
     def select(self, table: Type[Base], *criteria: ColumnExpressionArgument) -> Optional[Base]:
         return self._session.scalars(select(table).filter(*criteria)).first()
 
+    def select_all(self, table: Type[Base], *criteria: ColumnExpressionArgument) -> Sequence[Base]:
+        return self._session.scalars(select(table).filter(*criteria)).all()
+
     def add(self, entity: Base) -> None:
         self._session.add(entity)
+
+    def insert(self, table: Type[Base], rows: Sequence[dict[str, Any]]) -> None:
+        if not rows:
+            return
+
+        self._session.execute(insert(table), rows)
@@ -8,3 +8,7 @@ class CharmError(Exception):
 
 class CertificatesError(CharmError):
     """Error for tls certificates related operations."""
+
+
+class ConfigUpdateTimeoutError(CharmError):
+    """Error for the workload not observing the configuration update in time."""
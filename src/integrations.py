@@ -3,12 +3,16 @@
 
 import hashlib
 import ipaddress
+import json
 import logging
-import subprocess
+import socket
+import time
 from contextlib import suppress
 from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
 from secrets import token_hex
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
 from charms.certificate_transfer_interface.v0.certificate_transfer import (
     CertificateTransferProvides,
@@ -22,12 +26,12 @@ from charms.tls_certificates_interface.v4.tls_certificates import (
     TLSCertificatesRequiresV4,
 )
 from ops.charm import CharmBase
+from ops.model import Relation
 from ops.pebble import PathError
-from tenacity import Retrying, retry_if_exception_type, stop_after_attempt, wait_fixed
 
-from configs import DatabaseConfig, LdapServerConfig
 from constants import (
     CERTIFICATE_FILE,
+    CERTIFICATES_DIGEST_FILE,
     CERTIFICATES_INTEGRATION_NAME,
     CERTIFICATES_TRANSFER_INTEGRATION_NAME,
     DEFAULT_GID,
@@ -38,12 +42,27 @@ from constants import (
     SERVER_CERT,
     SERVER_KEY,
 )
-from database import Capability, Group, Operation, User
 from exceptions import CertificatesError
 
 logger = logging.getLogger(__name__)
 
 
+def service_host(charm: CharmBase) -> str:
+    return f"{charm.app.name}.{charm.model.name}.svc.cluster.local"
+
+
+def unit_host(charm: CharmBase, pod_name: str) -> str:
+    return f"{pod_name}.{charm.app.name}-endpoints.{charm.model.name}.svc.cluster.local"
+
+
+def unit_hosts(charm: CharmBase) -> List[str]:
+    # The pods of the StatefulSet are numbered from 0 to the number of units
+    return [
+        unit_host(charm, f"{charm.app.name}-{ordinal}")
+        for ordinal in range(charm.app.planned_units())
+    ]
+
+
 @dataclass
 class BindAccount:
     cn: str
@@ -52,6 +71,8 @@ class BindAccount:
 
 
 def _reset_account_password(dsn: str, user_name: str) -> str:
+    from database import Operation, User
+
     password = token_hex()
     password_sha256 = hashlib.sha256(password.encode()).hexdigest()
     with Operation(dsn) as op:
@@ -63,7 +84,24 @@ def _reset_account_password(dsn: str, user_name: str) -> str:
     return password
 
 
+def _reset_account_passwords(dsn: str, user_names: Sequence[str]) -> dict[str, str]:
+    from database import Operation, User
+
+    passwords = {}
+    with Operation(dsn) as op:
+        for user in op.select_all(User, User.name.in_(user_names)):
+            passwords[user.name] = password = token_hex()
+            user.password_sha256 = hashlib.sha256(password.encode()).hexdigest()
+
+        if missing := set(user_names) - passwords.keys():
+            raise RuntimeError(f"No users {sorted(missing)} found")
+
+    return passwords
+
+
 def _create_bind_account(dsn: str, user_name: str, group_name: str) -> BindAccount:
+    from database import Capability, Group, Operation, User
+
     with Operation(dsn) as op:
         if not op.select(Group, Group.name == group_name):
             group = Group(name=group_name, gid_number=DEFAULT_GID)
@@ -87,15 +125,68 @@ def _create_bind_account(dsn: str, user_name: str, group_name: str) -> BindAccou
     return BindAccount(user_name, group_name, password)
 
 
+@dataclass(frozen=True)
+class BindAccountRequest:
+    user: str
+    group: str
+    relation_id: int
+
+
+def _create_bind_accounts(
+    dsn: str, requests: Sequence[BindAccountRequest]
+) -> dict[int, BindAccount]:
+    from database import Capability, Group, Operation, User
+
+    group_names = {request.group for request in requests}
+    user_names = {request.user for request in requests}
+
+    with Operation(dsn) as op:
+        existing_groups = {
+            group.name for group in op.select_all(Group, Group.name.in_(group_names))
+        }
+        op.insert(
+            Group,
+            [
+                {"name": name, "gid_number": DEFAULT_GID}
+                for name in sorted(group_names - existing_groups)
+            ],
+        )
+
+        existing_users = {user.name for user in op.select_all(User, User.name.in_(user_names))}
+        passwords = {name: token_hex() for name in sorted(user_names - existing_users)}
+        op.insert(
+            User,
+            [
+                {
+                    "name": name,
+                    "uid_number": DEFAULT_UID,
+                    "gid_number": DEFAULT_GID,
+                    "password_sha256": hashlib.sha256(password.encode()).hexdigest(),
+                }
+                for name, password in passwords.items()
+            ],
+        )
+
+        if not op.select(Capability, Capability.user_id == DEFAULT_UID):
+            op.insert(Capability, [{"user_id": DEFAULT_UID}])
+
+    return {
+        request.relation_id: BindAccount(
+            request.user, request.group, passwords.get(request.user, "")
+        )
+        for request in requests
+    }
+
+
 class LdapIntegration:
     def __init__(self, charm: CharmBase):
         self._charm = charm
         self._bind_account: Optional[BindAccount] = None
 
     def load_bind_account(self, user: str, group: str, relation_id: int) -> None:
-        if LdapServerConfig.load(self._charm.ldap_requirer):
+        if self._charm.ldap_servers_config:
             return self.load_bind_account_from_remote_ldap()
-        if not (database_config := DatabaseConfig.load(self._charm.database_requirer)):
+        if not (database_config := self._charm.database_config):
             return
 
         self._bind_account = _create_bind_account(database_config.dsn, user, group)
@@ -105,8 +196,44 @@ class LdapIntegration:
                 password = _reset_account_password(database_config.dsn, user)
             self._bind_account.password = password
 
+    def load_bind_accounts(
+        self, requests: Sequence[BindAccountRequest]
+    ) -> dict[int, LdapProviderData]:
+        if not requests:
+            return {}
+
+        if self._charm.ldap_servers_config:
+            self.load_bind_account_from_remote_ldap()
+            if not (bind_account := self._bind_account):
+                return {}
+            return {request.relation_id: self._provider_data(bind_account) for request in requests}
+
+        if not (database_config := self._charm.database_config):
+            return {}
+
+        bind_accounts = _create_bind_accounts(database_config.dsn, requests)
+
+        stale_accounts = []
+        for relation_id, bind_account in bind_accounts.items():
+            if not bind_account.password:
+                bind_account.password = self._charm.ldap_provider.get_bind_password(relation_id)
+            if not bind_account.password:
+                stale_accounts.append(bind_account)
+
+        if stale_accounts:
+            passwords = _reset_account_passwords(
+                database_config.dsn, sorted({account.cn for account in stale_accounts})
+            )
+            for bind_account in stale_accounts:
+                bind_account.password = passwords[bind_account.cn]
+
+        return {
+            relation_id: self._provider_data(bind_account)
+            for relation_id, bind_account in bind_accounts.items()
+        }
+
     def load_bind_account_from_remote_ldap(self) -> None:
-        ldap_config = LdapServerConfig.load(self._charm.ldap_requirer)
+        ldap_config = self._charm.ldap_servers_config
 
         if not ldap_config or not ldap_config.ldap_server:
             return
@@ -119,13 +246,19 @@ class LdapIntegration:
             bind_dn.get("cn", ""), bind_dn.get("ou", ""), ldap_config.ldap_server.bind_password
         )
 
+    @property
+    def _hosts(self) -> List[str]:
+        if self._charm.config.get("ldap_address_mode") == "unit":
+            return unit_hosts(self._charm)
+
+        return [service_host(self._charm)]
+
     @property
     def ldap_urls(self) -> List[str]:
         if ingress := self._charm.ingress_per_unit.urls:
             return [f"ldap://{url}" for url in ingress.values()]
 
-        url = f"{self._charm.app.name}.{self._charm.model.name}.svc.cluster.local"
-        return [f"ldap://{url}:{GLAUTH_LDAP_PORT}"]
+        return [f"ldap://{host}:{GLAUTH_LDAP_PORT}" for host in self._hosts]
 
     @property
     def ldaps_urls(self) -> List[str]:
@@ -135,8 +268,7 @@ class LdapIntegration:
         if ingress := self._charm.ldaps_ingress_per_unit.urls:
             return [f"ldaps://{url}" for url in ingress.values()]
 
-        url = f"{self._charm.app.name}.{self._charm.model.name}.svc.cluster.local"
-        return [f"ldaps://{url}:{GLAUTH_LDAPS_PORT}"]
+        return [f"ldaps://{host}:{GLAUTH_LDAPS_PORT}" for host in self._hosts]
 
     @property
     def base_dn(self) -> str:
@@ -164,12 +296,15 @@ class LdapIntegration:
         if not self._bind_account:
             return None
 
+        return self._provider_data(self._bind_account)
+
+    def _provider_data(self, bind_account: BindAccount) -> LdapProviderData:
         return LdapProviderData(
             urls=self.ldap_urls,
             ldaps_urls=self.ldaps_urls,
             base_dn=self.base_dn,
-            bind_dn=f"cn={self._bind_account.cn},ou={self._bind_account.ou},{self.base_dn}",
-            bind_password=self._bind_account.password,
+            bind_dn=f"cn={bind_account.cn},ou={bind_account.ou},{self.base_dn}",
+            bind_password=bind_account.password,
             auth_method="simple",
             starttls=self.starttls_enabled,
         )
@@ -181,7 +316,7 @@ class AuxiliaryIntegration:
 
     @property
     def auxiliary_data(self) -> AuxiliaryData:
-        if not (database_config := DatabaseConfig.load(self._charm.database_requirer)):
+        if not (database_config := self._charm.database_config):
             return AuxiliaryData()
 
         return AuxiliaryData(
@@ -203,9 +338,14 @@ class CertificatesIntegration:
     def __init__(self, charm: CharmBase) -> None:
         self._charm = charm
         self._container = charm._container
+        self.pushed_bytes = 0
 
-        k8s_svc_host = f"{charm.app.name}.{charm.model.name}.svc.cluster.local"
+        k8s_svc_host = service_host(charm)
         sans_dns, sans_ip = [k8s_svc_host], []
+        # Only request the per-pod name when it is advertised, so the CSR of the existing
+        # deployments does not change
+        if charm.config.get("ldap_address_mode") == "unit":
+            sans_dns.append(unit_host(charm, socket.gethostname()))
 
         for ingress in (charm.ingress_per_unit, charm.ldaps_ingress_per_unit):
             if ingress_url := ingress.url:
@@ -258,6 +398,10 @@ class CertificatesIntegration:
         cert, *_ = self.cert_requirer.get_assigned_certificate(self.csr_attributes)
         return cert
 
+    @property
+    def cert_expiry_time(self) -> Optional[datetime]:
+        return self._certs.certificate.expiry_time if self._certs else None
+
     @property
     def cert_data(self) -> CertificateData:
         return CertificateData(
@@ -266,55 +410,102 @@ class CertificatesIntegration:
             cert=self._server_cert,
         )
 
-    def update_certificates(self) -> None:
+    def update_certificates(self) -> set[Path]:
         if not self._charm.model.get_relation(CERTIFICATES_INTEGRATION_NAME):
             logger.debug("The certificates integration is not ready.")
             self._remove_certificates()
-            return
+            return set()
 
         if not self.certs_ready():
             logger.debug("The certificates data is not ready.")
             self._remove_certificates()
-            return
+            return set()
 
-        self._prepare_certificates()
-        self._push_certificates()
+        return self._push_certificates()
+
+    def stale_certificates(self) -> set[Path]:
+        if not self._charm.model.get_relation(CERTIFICATES_INTEGRATION_NAME):
+            return set()
+
+        if not self.certs_ready():
+            return set()
+
+        files = self._certificate_files()
+        return self._stale_files(files, self._digests(files))
 
     def certs_ready(self) -> bool:
         certs, private_key = self.cert_requirer.get_assigned_certificate(self.csr_attributes)
         return all((certs, private_key))
 
-    def _prepare_certificates(self) -> None:
-        SERVER_CA_CERT.write_text(self._ca_cert)  # type: ignore[arg-type]
-        SERVER_KEY.write_text(self._server_key)  # type: ignore[arg-type]
-        SERVER_CERT.write_text(self._server_cert)  # type: ignore[arg-type]
-
+    def _trust_bundle(self) -> str:
+        # The charm container's system bundle is never modified, so the workload
+        # bundle is built by appending the GLAuth CA and certificate to it instead
+        # of rebuilding the whole trust store with `update-ca-certificates --fresh`
         try:
-            for attempt in Retrying(
-                wait=wait_fixed(3),
-                stop=stop_after_attempt(3),
-                retry=retry_if_exception_type(subprocess.CalledProcessError),
-                reraise=True,
-            ):
-                with attempt:
-                    subprocess.run(
-                        ["update-ca-certificates", "--fresh"],
-                        check=True,
-                        text=True,
-                        capture_output=True,
-                    )
-        except subprocess.CalledProcessError as e:
-            logger.error(f"{e.stderr}")
+            system_bundle = CERTIFICATE_FILE.read_text()
+        except OSError as e:
+            logger.error(f"Failed to read the system CA bundle: {e}")
             raise CertificatesError("Update the TLS certificates failed.")
 
-    def _push_certificates(self) -> None:
-        self._container.push(CERTIFICATE_FILE, CERTIFICATE_FILE.read_text(), make_dirs=True)
-        self._container.push(SERVER_CA_CERT, self._ca_cert, make_dirs=True)
-        self._container.push(SERVER_KEY, self._server_key, make_dirs=True)
-        self._container.push(SERVER_CERT, self._server_cert, make_dirs=True)
+        return "\n".join([system_bundle.rstrip(), self._ca_cert, self._server_cert])  # type: ignore[list-item]
+
+    def _pushed_digests(self) -> dict[str, str]:
+        try:
+            return json.loads(self._container.pull(CERTIFICATES_DIGEST_FILE).read())
+        except (PathError, ValueError):
+            return {}
+
+    def _certificate_files(self) -> dict[Path, str]:
+        return {
+            CERTIFICATE_FILE: self._trust_bundle(),
+            SERVER_CA_CERT: self._ca_cert,  # type: ignore[dict-item]
+            SERVER_KEY: self._server_key,  # type: ignore[dict-item]
+            SERVER_CERT: self._server_cert,  # type: ignore[dict-item]
+        }
+
+    @staticmethod
+    def _digests(files: dict[Path, str]) -> dict[str, str]:
+        return {
+            str(path): hashlib.sha256(content.encode()).hexdigest()
+            for path, content in files.items()
+        }
+
+    def _stale_files(self, files: dict[Path, str], digests: dict[str, str]) -> set[Path]:
+        # The digest manifest lives next to the files, so it is reset together with
+        # them when the workload container restarts
+        pushed_digests = self._pushed_digests()
+        return {path for path in files if pushed_digests.get(str(path)) != digests[str(path)]}
+
+    def _push_certificates(self) -> set[Path]:
+        files = self._certificate_files()
+        digests = self._digests(files)
+
+        changed = self._stale_files(files, digests)
+        if not changed:
+            logger.debug("The TLS certificates are up to date, skip pushing")
+            return changed
+
+        start, pushed_bytes = time.perf_counter(), 0
+        for path in changed:
+            self._container.push(path, files[path], make_dirs=True)
+            pushed_bytes += len(files[path].encode())
+        self._container.push(CERTIFICATES_DIGEST_FILE, json.dumps(digests), make_dirs=True)
+        self.pushed_bytes += pushed_bytes
+
+        logger.info(
+            f"Pushed {len(changed)} certificate file(s), {pushed_bytes} bytes "
+            f"in {time.perf_counter() - start:.3f}s"
+        )
+        return changed
 
     def _remove_certificates(self) -> None:
-        for file in (CERTIFICATE_FILE, SERVER_CA_CERT, SERVER_KEY, SERVER_CERT):
+        for file in (
+            CERTIFICATE_FILE,
+            SERVER_CA_CERT,
+            SERVER_KEY,
+            SERVER_CERT,
+            CERTIFICATES_DIGEST_FILE,
+        ):
             with suppress(PathError):
                 self._container.remove_path(file)
 
@@ -343,10 +534,32 @@ class CertificatesTransferIntegration:
                 self._certs_transfer_provider.remove_certificate(relation_id=relation.id)
             return
 
-        for relation in relations:
+        # Unchanged relations are not rewritten, so their consumers are not woken up
+        stale_relations = [
+            relation for relation in relations if not self._is_transferred(relation, data)
+        ]
+        for relation in stale_relations:
             self._certs_transfer_provider.set_certificate(
                 ca=data.ca_cert,  # type: ignore[arg-type]
                 chain=data.ca_chain,  # type: ignore[arg-type]
                 certificate=data.cert,  # type: ignore[arg-type]
                 relation_id=relation.id,
             )
+
+        logger.debug(
+            f"Transferred the certificates to {len(stale_relations)} relation(s), "
+            f"{len(relations) - len(stale_relations)} already up to date"
+        )
+
+    def _is_transferred(self, relation: Relation, data: CertificateData) -> bool:
+        unit_data = relation.data[self._charm.unit]
+        try:
+            chain = json.loads(unit_data.get("chain", "null"))
+        except ValueError:
+            return False
+
+        return (
+            unit_data.get("certificate") == data.cert
+            and unit_data.get("ca") == data.ca_cert
+            and chain == data.ca_chain
+        )
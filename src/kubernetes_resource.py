@@ -28,22 +28,13 @@ class ConfigMapResource:
     def name(self) -> str:
         return self._name
 
-    def get(self) -> AllNamespacedResource:
-        try:
-            cm = self._client.get(ConfigMap, self._name, namespace=self._client.namespace)
-            return cm
-        except ApiError as e:
-            logging.error(f"Error fetching ConfigMap: {e}")
-
-    def create(self, data: Optional[dict] = None) -> None:
-        if self.get():
-            return
-
-        cm = ConfigMap(
+    def _manifest(self, data: Optional[dict] = None) -> ConfigMap:
+        return ConfigMap(
             apiVersion="v1",
             kind="ConfigMap",
             metadata=ObjectMeta(
                 name=self._name,
+                namespace=self._client.namespace,
                 labels={
                     "app.kubernetes.io/managed-by": "juju",
                 },
@@ -51,22 +42,29 @@ class ConfigMapResource:
             data=data,
         )
 
+    def get(self) -> AllNamespacedResource:
         try:
-            self._client.create(cm)
+            cm = self._client.get(ConfigMap, self._name, namespace=self._client.namespace)
+            return cm
         except ApiError as e:
+            logging.error(f"Error fetching ConfigMap: {e}")
+
+    def create(self, data: Optional[dict] = None) -> None:
+        # Create optimistically, an existing ConfigMap is reported as a conflict
+        try:
+            self._client.create(self._manifest(data))
+        except ApiError as e:
+            if e.status.code == 409:
+                return
+
             logging.error(f"Error creating ConfigMap: {e}")
             raise KubernetesResourceError(f"Failed to create ConfigMap {self._name}")
 
     def patch(self, data: dict) -> None:
-        patch_data = {"data": data}
-
+        # Server-side apply under the client's field manager, so the same data
+        # never conflicts with or bumps the resource owned by this application
         try:
-            self._client.patch(
-                ConfigMap,
-                name=self._name,
-                namespace=self._client.namespace,
-                obj=patch_data,
-            )
+            self._client.apply(self._manifest(data), force=True)
         except ApiError as e:
             logging.error(f"Error updating ConfigMap: {e}")
 
@@ -74,6 +72,9 @@ class ConfigMapResource:
         try:
             self._client.delete(ConfigMap, self._name, namespace=self._client.namespace)
         except ApiError as e:
+            if e.status.code == 404:
+                return
+
             logging.error(f"Error deleting ConfigMap: {e}")
 
 
@@ -93,7 +94,7 @@ class StatefulSetResource:
         except ApiError as e:
             logging.error(f"Error fetching ConfigMap: {e}")
 
-    def patch(self, data: dict) -> None:
+    def patch(self, data: dict) -> bool:
         try:
             self._client.patch(
                 StatefulSet,
@@ -103,3 +104,6 @@ class StatefulSetResource:
             )
         except ApiError as e:
             logging.error(f"Error patching the StatefulSet: {e}")
+            return False
+
+        return True
@@ -8,16 +8,20 @@ from typing import Any, Callable, Optional
 from ops import ModelError
 from ops.charm import CharmBase, EventBase
 from ops.model import BlockedStatus, WaitingStatus
-from tenacity import Retrying, TryAgain, wait_fixed
+from tenacity import RetryError, Retrying, TryAgain, stop_after_delay, wait_exponential
 
+from configs import BehaviorsConfig, DatabaseConfig
 from constants import (
     DATABASE_INTEGRATION_NAME,
-    GLAUTH_CONFIG_FILE,
+    GLAUTH_CONFIG_DIGEST_FILE,
+    GLAUTH_CONFIG_UPDATE_TIMEOUT,
+    LDAP_ADDRESS_MODES,
     LDAP_CLIENT_INTEGRATION_NAME,
     SERVER_CERT,
     SERVER_KEY,
     WORKLOAD_SERVICE,
 )
+from exceptions import ConfigUpdateTimeoutError
 
 logger = logging.getLogger(__name__)
 
@@ -25,14 +29,29 @@ ConditionEvaluation = tuple[bool, str]
 Condition = Callable[[CharmBase], ConditionEvaluation]
 
 
+def evaluate(charm: CharmBase, condition: Condition) -> ConditionEvaluation:
+    """Evaluate a condition at most once per dispatch, until the cache is reset."""
+    if (cache := getattr(charm, "_condition_cache", None)) is None:
+        cache = charm._condition_cache = {}
+
+    if condition not in cache:
+        cache[condition] = condition(charm)
+    return cache[condition]
+
+
+def reset_conditions(charm: CharmBase) -> None:
+    """Drop the cached evaluations after changing the workload state."""
+    charm._condition_cache = {}
+
+
 def container_not_connected(charm: CharmBase) -> ConditionEvaluation:
     not_connected = not charm._container.can_connect()
     return not_connected, ("Container is not connected yet" if not_connected else "")
 
 
 def service_not_ready(charm: CharmBase) -> ConditionEvaluation:
-    if not charm._container.can_connect():
-        return True, "Container is not connected yet"
+    if (not_connected := evaluate(charm, container_not_connected))[0]:
+        return not_connected
 
     try:
         service = charm._container.get_service(WORKLOAD_SERVICE)
@@ -63,7 +82,10 @@ def database_not_ready(charm: CharmBase) -> ConditionEvaluation:
 
 
 def ldap_provider_not_ready(charm: CharmBase) -> ConditionEvaluation:
-    not_ready = not charm.ldap_requirer.ready()
+    # The upstream LDAP servers are pooled, serve as soon as any of them is ready
+    not_ready = not any(
+        charm.ldap_requirer.ready(relation.id) for relation in charm.ldap_requirer.relations
+    )
     return not_ready, ("Waiting for ldap user creation" if not_ready else "")
 
 
@@ -82,18 +104,25 @@ def backend_integration_not_exists(charm: CharmBase) -> ConditionEvaluation:
 
 def backend_not_ready(charm: CharmBase) -> ConditionEvaluation:
     if charm.model.relations[DATABASE_INTEGRATION_NAME]:
-        not_ready, msg = database_not_ready(charm)
+        not_ready, msg = evaluate(charm, database_not_ready)
         if not_ready:
             return not_ready, msg
 
     if charm.model.relations[LDAP_CLIENT_INTEGRATION_NAME]:
-        not_ready, msg = ldap_provider_not_ready(charm)
+        not_ready, msg = evaluate(charm, ldap_provider_not_ready)
         if not_ready:
             return not_ready, msg
 
     return False, ""
 
 
+def config_invalid(charm: CharmBase) -> ConditionEvaluation:
+    msg = BehaviorsConfig.validate(charm.config) or DatabaseConfig.validate(charm.config)
+    if (mode := charm.config.get("ldap_address_mode", "service")) not in LDAP_ADDRESS_MODES:
+        msg = msg or f"Invalid ldap address mode '{mode}'"
+    return bool(msg), msg or ""
+
+
 def block_when(*conditions: Condition) -> Callable:
     def decorator(func: Callable) -> Callable:
         @wraps(func)
@@ -102,7 +131,7 @@ def block_when(*conditions: Condition) -> Callable:
             logger.debug(f"Handling event: {event}.")
 
             for condition in conditions:
-                resp, msg = condition(charm)
+                resp, msg = evaluate(charm, condition)
                 if resp:
                     event.defer()
                     charm.unit.status = BlockedStatus(msg)
@@ -123,7 +152,7 @@ def wait_when(*conditions: Condition) -> Callable:
             logger.debug(f"Handling event: {event}.")
 
             for condition in conditions:
-                resp, msg = condition(charm)
+                resp, msg = evaluate(charm, condition)
                 if resp:
                     event.defer()
                     charm.unit.status = WaitingStatus(msg)
@@ -154,14 +183,20 @@ def after_config_updated(func: Callable) -> Callable:
             return func(charm, *args, **kwargs)
 
         charm.unit.status = WaitingStatus("Waiting for configuration to be updated")
-        for attempt in Retrying(
-            wait=wait_fixed(3),
-        ):
-            expected_config = charm.fetch_cm()
-            current_config = charm._container.pull(GLAUTH_CONFIG_FILE).read()
-            with attempt:
-                if expected_config != current_config:
-                    raise TryAgain
+        expected_digest = charm.config_digest or charm.config_file.digest
+        try:
+            for attempt in Retrying(
+                wait=wait_exponential(min=1, max=8),
+                stop=stop_after_delay(GLAUTH_CONFIG_UPDATE_TIMEOUT),
+            ):
+                with attempt:
+                    current_digest = charm._container.pull(GLAUTH_CONFIG_DIGEST_FILE).read()
+                    if expected_digest != current_digest:
+                        raise TryAgain
+        except RetryError:
+            raise ConfigUpdateTimeoutError(
+                f"The configuration is not updated in {GLAUTH_CONFIG_UPDATE_TIMEOUT} seconds"
+            )
 
         return func(charm, *args, **kwargs)
 
@@ -19,3 +19,9 @@ LDAPS_INGRESS_APP = "ldaps-ingress"
 
 JUJU_SECRET_ID_REGEX = re.compile(r"secret:(?://[a-f0-9-]+/)?(?P<secret_id>[a-zA-Z0-9]+)")
 INGRESS_URL_REGEX = re.compile(r"url:\s*(?P<ingress_url>\d{1,3}(?:\.\d{1,3}){3}:\d+)")
+
+GLAUTH_LDAP_PORT = 3893
+
+# Certificate rotation connection-loss probe
+ROTATION_PROBE_INTERVAL = 0.5
+ROTATION_UNITS = 2
@@ -4,6 +4,9 @@
 
 import json
 import logging
+import threading
+import time
+from contextlib import suppress
 from pathlib import Path
 from typing import Callable, Optional
 
@@ -16,9 +19,12 @@ from integration.constants import (
     GLAUTH_APP,
     GLAUTH_CLIENT_APP,
     GLAUTH_IMAGE,
+    GLAUTH_LDAP_PORT,
     GLAUTH_PROXY,
     INGRESS_APP,
     LDAPS_INGRESS_APP,
+    ROTATION_PROBE_INTERVAL,
+    ROTATION_UNITS,
     TRAEFIK_CHARM,
 )
 from integration.tester import ANY_CHARM
@@ -28,7 +34,9 @@ from integration.utils import (
     any_error,
     extract_certificate_common_name,
     extract_certificate_sans,
+    get_unit_address,
     ldap_connection,
+    remove_integration,
 )
 
 logger = logging.getLogger(__name__)
@@ -443,3 +451,146 @@ class TestGlauthClientPydanticV1(GlauthClientTestSuite):
     @pytest.fixture()
     def pydantic_version(self) -> str:
         return "1.0"
+
+
+def test_behaviors_reloaded_without_restart(
+    juju: jubilant.Juju,
+    initialize_database: None,
+    ldap_configurations: Optional[tuple[str, str, str]],
+    ingress_url: Optional[str],
+) -> None:
+    assert ldap_configurations, "LDAP configuration should be ready"
+    base_dn, bind_dn, bind_password = ldap_configurations
+    ldap_uri = f"ldap://{ingress_url}"
+
+    def failed_binds_limited() -> bool:
+        for _ in range(2):
+            with suppress(ldap.LDAPError):
+                with ldap_connection(uri=ldap_uri, bind_dn=bind_dn, bind_password="wrong"):
+                    pass
+
+        try:
+            with ldap_connection(uri=ldap_uri, bind_dn=bind_dn, bind_password=bind_password):
+                return False
+        except ldap.LDAPError:
+            return True
+
+    # The default behaviors allow more than two failed binds
+    assert not failed_binds_limited()
+
+    # The connection is dropped if GLAuth restarts to apply the behaviors
+    with ldap_connection(uri=ldap_uri, bind_dn=bind_dn, bind_password=bind_password) as conn:
+        juju.config(GLAUTH_APP, {"failed_binds_max": 1, "failed_binds_block_duration": 5})
+        try:
+            juju.wait(
+                ready=all_active(GLAUTH_APP),
+                error=any_error(GLAUTH_APP),
+                timeout=5 * 60,
+            )
+
+            # GLAuth watches the mounted configuration, which the kubelet syncs
+            # asynchronously. The probes are spaced beyond the failed binds period, so
+            # the default behaviors never limit them
+            deadline = time.monotonic() + 3 * 60
+            while not (limited := failed_binds_limited()) and time.monotonic() < deadline:
+                time.sleep(15)
+            assert limited, "The behaviors are not applied"
+
+            res = conn.search_s(base=base_dn, scope=ldap.SCOPE_SUBTREE, filterstr="(cn=hackers)")
+            assert res[0], "The connection opened before the reload is not served"
+        finally:
+            juju.config(GLAUTH_APP, reset=["failed_binds_max", "failed_binds_block_duration"])
+            juju.wait(ready=all_active(GLAUTH_APP), error=any_error(GLAUTH_APP), timeout=5 * 60)
+
+
+def test_certificate_rotation_connection_loss(
+    juju: jubilant.Juju,
+    initialize_database: None,
+    ldap_configurations: Optional[tuple[str, str, str]],
+    app_integration_data: Callable,
+    record_property: Callable[[str, object], None],
+) -> None:
+    assert ldap_configurations, "LDAP configuration should be ready"
+    _, bind_dn, bind_password = ldap_configurations
+
+    def glauth_certificate() -> Optional[str]:
+        data = app_integration_data(GLAUTH_APP, "certificates") or {}
+        certificates = json.loads(data.get("certificates") or "[]")
+        return certificates[0]["certificate"] if certificates else None
+
+    assert (certificate := glauth_certificate()), "Certificates should be issued"
+
+    # The ingress-per-unit integrations prevent scaling up, see
+    # https://github.com/canonical/traefik-k8s-operator/issues/406, so the
+    # units are probed over their pod addresses instead
+    with (
+        remove_integration(juju, INGRESS_APP, "ingress"),
+        remove_integration(juju, LDAPS_INGRESS_APP, "ldaps-ingress"),
+    ):
+        juju.cli("scale-application", GLAUTH_APP, str(ROTATION_UNITS))
+        juju.wait(
+            ready=and_(
+                all_active(GLAUTH_APP),
+                lambda status: len(status.apps[GLAUTH_APP].units) == ROTATION_UNITS,
+            ),
+            error=any_error(GLAUTH_APP),
+            timeout=10 * 60,
+        )
+        ldap_uris = [
+            f"ldap://{get_unit_address(juju, GLAUTH_APP, unit_num)}:{GLAUTH_LDAP_PORT}"
+            for unit_num in range(ROTATION_UNITS)
+        ]
+
+        rounds, unit_failures, outages = 0, dict.fromkeys(ldap_uris, 0), 0
+        stop = threading.Event()
+
+        def probe() -> None:
+            nonlocal rounds, outages
+            while not stop.is_set():
+                rounds += 1
+                failed = 0
+                for ldap_uri in ldap_uris:
+                    try:
+                        with ldap_connection(
+                            uri=ldap_uri,
+                            bind_dn=bind_dn,
+                            bind_password=bind_password,
+                            starttls=True,
+                        ):
+                            pass
+                    except ldap.LDAPError:
+                        unit_failures[ldap_uri] += 1
+                        failed += 1
+                if failed == len(ldap_uris):
+                    outages += 1
+                stop.wait(ROTATION_PROBE_INTERVAL)
+
+        prober = threading.Thread(target=probe, daemon=True)
+        prober.start()
+        try:
+            # A new CA re-issues the GLAuth certificates
+            juju.config(CERTIFICATE_PROVIDER_APP, {"ca-common-name": "glauth-rotated-ca"})
+            juju.wait(
+                ready=lambda status: (
+                    all_active(GLAUTH_APP)(status) and glauth_certificate() != certificate
+                ),
+                error=any_error(GLAUTH_APP),
+                timeout=5 * 60,
+            )
+        finally:
+            stop.set()
+            prober.join()
+            juju.cli("scale-application", GLAUTH_APP, "1")
+            juju.wait(
+                ready=lambda status: len(status.apps[GLAUTH_APP].units) == 1,
+                timeout=10 * 60,
+            )
+
+    logger.info(
+        f"Certificate rotation: {outages} of {rounds} probe rounds failed on every unit, "
+        f"failed StartTLS binds per unit {unit_failures}"
+    )
+    record_property("rotation_failed_binds", sum(unit_failures.values()))
+    record_property("rotation_outage_rounds", outages)
+    # The units restart one at a time, so one of them always accepts the binds
+    assert outages == 0
@@ -147,10 +147,15 @@ def or_(*predicates: StatusPredicate) -> StatusPredicate:
 
 @contextmanager
 def ldap_connection(
-    uri: str, bind_dn: str, bind_password: str
+    uri: str, bind_dn: str, bind_password: str, starttls: bool = False
 ) -> Iterator[ldap.ldapobject.LDAPObject]:
     conn = ldap.initialize(uri)
     try:
+        if starttls:
+            # The self-signed CA is not in the test runner's trust store
+            conn.set_option(ldap.OPT_X_TLS_REQUIRE_CERT, ldap.OPT_X_TLS_NEVER)
+            conn.set_option(ldap.OPT_X_TLS_NEWCTX, 0)
+            conn.start_tls_s()
         conn.simple_bind_s(bind_dn, bind_password)
         yield conn
     finally:
@@ -175,6 +175,13 @@ def create_state(
     )
 
 
+def charm_stored_state(state: State) -> dict:
+    """The content of the GLAuthCharm stored state."""
+    return next(
+        stored for stored in state.stored_states if stored.owner_path == "GLAuthCharm"
+    ).content
+
+
 # ---------------------------------------------------------------------------
 # Relation fixtures
 # ---------------------------------------------------------------------------
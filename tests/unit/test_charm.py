@@ -1,7 +1,15 @@
 # Copyright 2023 Canonical Ltd.
 # See LICENSE file for licensing details.
 
-from unittest.mock import MagicMock
+import json
+import os
+import subprocess
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Callable
+from unittest.mock import MagicMock, call, patch
 
 import pytest
 from charms.tls_certificates_interface.v4.tls_certificates import (
@@ -9,18 +17,39 @@ from charms.tls_certificates_interface.v4.tls_certificates import (
     CertificateSigningRequest,
 )
 from conftest import (
+    _WORKLOAD_LAYER,
     DB_ENDPOINTS,
     DB_PASSWORD,
     DB_USERNAME,
     LDAP_PROVIDER_DATA,
     LDAPS_PROVIDER_DATA,
+    charm_stored_state,
     create_state,
 )
+from lightkube.models.apps_v1 import StatefulSetSpec
+from lightkube.models.core_v1 import ConfigMapVolumeSource
+from lightkube.models.core_v1 import Container as K8sContainer
+from lightkube.models.core_v1 import PodSpec, PodTemplateSpec, Volume, VolumeMount
+from lightkube.models.meta_v1 import LabelSelector
+from lightkube.resources.apps_v1 import StatefulSet
 from ops.model import ActiveStatus, BlockedStatus, WaitingStatus
-from ops.testing import Container, Context, Relation
-
-from constants import CERTIFICATES_INTEGRATION_NAME, WORKLOAD_CONTAINER
-from exceptions import CertificatesError
+from ops.pebble import ServiceStatus
+from ops.testing import Container, Context, Model, PeerRelation, Relation
+
+from configs import LdapServerConfig
+from constants import (
+    CERTIFICATES_INTEGRATION_NAME,
+    CERTIFICATES_TRANSFER_INTEGRATION_NAME,
+    GLAUTH_CONFIG_DIR,
+    PEER_INTEGRATION_NAME,
+    SERVER_CA_CERT,
+    SERVER_CERT,
+    SERVER_KEY,
+    WORKLOAD_CONTAINER,
+    WORKLOAD_SERVICE,
+)
+from exceptions import CertificatesError, ConfigUpdateTimeoutError
+from integrations import BindAccountRequest, CertificateData
 from kubernetes_resource import KubernetesResourceError
 
 
@@ -41,6 +70,64 @@ class TestInstallEvent:
             context.run(context.on.install(), state)
 
 
+class TestCharmStartup:
+    @pytest.mark.parametrize(
+        "event_name",
+        ["install", "remove", "update_status", "config_changed", "leader_elected"],
+    )
+    def test_startup_time(
+        self,
+        context: Context,
+        event_name: str,
+        record_property: Callable[[str, object], None],
+    ) -> None:
+        state = create_state()
+
+        start = time.perf_counter()
+        with context(getattr(context.on, event_name)(), state) as mgr:
+            elapsed = time.perf_counter() - start
+            lazy = {"config_file", "_ldap_integration", "_auxiliary_integration", "_k8s_client"}
+            constructed = lazy & vars(mgr.charm).keys()
+
+        record_property("startup_seconds", elapsed)
+        assert not constructed
+
+    def test_import_time(self, record_property: Callable[[str, object], None]) -> None:
+        root = Path(__file__).parents[2]
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(root / "src"), str(root / "lib")])}
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import charm"],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        # Lines look like `import time:  self [us] | cumulative | imported package`
+        imports = {
+            name.strip(): int(cumulative)
+            for _, cumulative, name in (
+                line.removeprefix("import time:").split("|")
+                for line in result.stderr.splitlines()
+                if line.startswith("import time:") and "cumulative" not in line
+            )
+        }
+
+        record_property("import_charm_us", imports["charm"])
+        assert not {"database", "sqlalchemy", "jinja2"} & imports.keys()
+
+
+class TestCertificatesSans:
+    @pytest.mark.parametrize("ldap_address_mode,unit_san", [("service", False), ("unit", True)])
+    def test_unit_host_san(self, context: Context, ldap_address_mode: str, unit_san: bool) -> None:
+        state = create_state(config={"ldap_address_mode": ldap_address_mode})
+        with context(context.on.update_status(), state) as mgr:
+            sans_dns = mgr.charm._certs_integration.csr_attributes.sans_dns
+
+        assert len(sans_dns) == (2 if unit_san else 1)
+        assert any("-endpoints." in san for san in sans_dns) is unit_san
+
+
 class TestRemoveEvent:
     def test_on_remove_non_leader_unit(
         self, context: Context, mocked_configmap: MagicMock
@@ -74,6 +161,8 @@ class TestPebbleReadyEvent:
 
         assert out.unit_status == WaitingStatus("Container is not connected yet")
         mocked_statefulset.patch.assert_called_once()
+        stored = charm_stored_state(out)
+        assert stored["statefulset_template_changes"] == 1
 
     def test_when_missing_database_relation(
         self,
@@ -93,6 +182,82 @@ class TestPebbleReadyEvent:
         )
         mocked_statefulset.patch.assert_called_once()
 
+    def test_when_statefulset_patch_failed(
+        self,
+        context: Context,
+        db_relation: Relation,
+        mocked_statefulset: MagicMock,
+        certificates_relation: Relation,
+    ) -> None:
+        mocked_statefulset.patch.return_value = False
+        state = create_state(relations=[db_relation, certificates_relation])
+        out = context.run(context.on.pebble_ready(state.get_container(WORKLOAD_CONTAINER)), state)
+
+        mocked_statefulset.patch.assert_called_once()
+        stored = charm_stored_state(out)
+        assert stored["statefulset_template_changes"] == 0
+
+    def test_when_glauth_config_mounted(
+        self,
+        context: Context,
+        db_relation: Relation,
+        mocked_statefulset: MagicMock,
+        mocked_configmap: MagicMock,
+        certificates_relation: Relation,
+    ) -> None:
+        mocked_configmap.name = "glauth-k8s"
+        mocked_statefulset.get.return_value = StatefulSet(
+            spec=StatefulSetSpec(
+                selector=LabelSelector(),
+                serviceName="glauth-k8s",
+                template=PodTemplateSpec(
+                    spec=PodSpec(
+                        containers=[
+                            K8sContainer(
+                                name=WORKLOAD_CONTAINER,
+                                volumeMounts=[
+                                    VolumeMount(
+                                        mountPath=str(GLAUTH_CONFIG_DIR), name="glauth-config"
+                                    )
+                                ],
+                            )
+                        ],
+                        volumes=[
+                            Volume(
+                                name="glauth-config",
+                                configMap=ConfigMapVolumeSource(name="glauth-k8s"),
+                            )
+                        ],
+                    )
+                ),
+            )
+        )
+        state = create_state(relations=[db_relation, certificates_relation])
+        out = context.run(context.on.pebble_ready(state.get_container(WORKLOAD_CONTAINER)), state)
+
+        mocked_statefulset.patch.assert_not_called()
+        stored = charm_stored_state(out)
+        assert stored["statefulset_template_changes"] == 0
+
+    def test_when_statefulset_pod_spec_missing(
+        self,
+        context: Context,
+        db_relation: Relation,
+        mocked_statefulset: MagicMock,
+        certificates_relation: Relation,
+    ) -> None:
+        mocked_statefulset.get.return_value = StatefulSet(
+            spec=StatefulSetSpec(
+                selector=LabelSelector(),
+                serviceName="glauth-k8s",
+                template=PodTemplateSpec(),
+            )
+        )
+        state = create_state(relations=[db_relation, certificates_relation])
+        context.run(context.on.pebble_ready(state.get_container(WORKLOAD_CONTAINER)), state)
+
+        mocked_statefulset.patch.assert_called_once()
+
     def test_when_missing_certificates_relation(
         self,
         context: Context,
@@ -187,6 +352,64 @@ class TestDatabaseCreatedEvent:
         assert out.unit_status == ActiveStatus()
 
 
+class TestUpdateStatusEvent:
+    def test_when_healthy(
+        self,
+        context: Context,
+        mocker: MagicMock,
+        certificates_relation: Relation,
+        db_relation_ready: Relation,
+    ) -> None:
+        mocked_handle_event_update = mocker.patch("charm.GLAuthCharm._handle_event_update")
+        state = replace(
+            create_state(relations=[certificates_relation, db_relation_ready]),
+            unit_status=ActiveStatus(),
+        )
+        out = context.run(context.on.update_status(), state)
+
+        assert out.unit_status == ActiveStatus()
+        mocked_handle_event_update.assert_not_called()
+
+    def test_when_service_not_running(
+        self,
+        context: Context,
+        mocker: MagicMock,
+        certificates_relation: Relation,
+        db_relation_ready: Relation,
+    ) -> None:
+        mocked_handle_event_update = mocker.patch("charm.GLAuthCharm._handle_event_update")
+        container = Container(
+            WORKLOAD_CONTAINER,
+            can_connect=True,
+            layers={"workload": _WORKLOAD_LAYER},
+            service_statuses={WORKLOAD_SERVICE: ServiceStatus.INACTIVE},
+        )
+        state = replace(
+            create_state(
+                relations=[certificates_relation, db_relation_ready], containers=[container]
+            ),
+            unit_status=ActiveStatus(),
+        )
+        context.run(context.on.update_status(), state)
+
+        mocked_handle_event_update.assert_called_once()
+
+    def test_when_not_active(
+        self,
+        context: Context,
+        certificates_relation: Relation,
+        db_relation_ready: Relation,
+        mocked_tls_certificates: MagicMock,
+    ) -> None:
+        state = replace(
+            create_state(relations=[certificates_relation, db_relation_ready]),
+            unit_status=WaitingStatus("Waiting for database creation"),
+        )
+        out = context.run(context.on.update_status(), state)
+
+        assert out.unit_status == ActiveStatus()
+
+
 class TestConfigChangedEvent:
     def test_when_container_not_connected(
         self,
@@ -203,6 +426,20 @@ class TestConfigChangedEvent:
 
         assert out.unit_status == WaitingStatus("Container is not connected yet")
 
+    def test_when_config_invalid(
+        self,
+        context: Context,
+        db_relation_ready: Relation,
+        certificates_relation: Relation,
+    ) -> None:
+        state = create_state(
+            relations=[db_relation_ready, certificates_relation],
+            config={"behaviors_preset": "unknown"},
+        )
+        out = context.run(context.on.config_changed(), state)
+
+        assert out.unit_status == BlockedStatus("Invalid behaviors preset 'unknown'")
+
     def test_when_missing_database_relation(
         self,
         context: Context,
@@ -262,6 +499,97 @@ class TestConfigChangedEvent:
 
         assert out.unit_status == ActiveStatus()
 
+    def test_config_not_rendered_when_inputs_unchanged(
+        self,
+        context: Context,
+        mocker: MagicMock,
+        certificates_relation: Relation,
+        db_relation_ready: Relation,
+        mocked_tls_certificates: MagicMock,
+        mocked_configmap: MagicMock,
+    ) -> None:
+        state = create_state(relations=[certificates_relation, db_relation_ready])
+        out = context.run(context.on.config_changed(), state)
+        mocked_render = mocker.patch("charm.ConfigFile.render")
+
+        out = context.run(context.on.config_changed(), out)
+
+        assert out.unit_status == ActiveStatus()
+        mocked_render.assert_not_called()
+        mocked_configmap.patch.assert_called_once()
+
+    @pytest.mark.parametrize(
+        "config,restart",
+        [
+            ({"failed_binds_max": 5}, False),
+            ({"base_dn": "dc=example,dc=com"}, True),
+            ({"ldaps_enabled": True}, True),
+        ],
+    )
+    def test_config_reload_or_restart(
+        self,
+        context: Context,
+        certificates_relation: Relation,
+        db_relation_ready: Relation,
+        mocked_tls_certificates: MagicMock,
+        mocked_restart_glauth_service: MagicMock,
+        config: dict,
+        restart: bool,
+    ) -> None:
+        state = create_state(relations=[certificates_relation, db_relation_ready])
+        out = context.run(context.on.config_changed(), state)
+
+        out = context.run(context.on.config_changed(), replace(out, config=config))
+
+        mocked_restart_glauth_service.assert_called_with(restart=restart)
+
+    def test_when_config_update_timed_out(
+        self,
+        context: Context,
+        certificates_relation: Relation,
+        db_relation_ready: Relation,
+        mocked_tls_certificates: MagicMock,
+        mocked_restart_glauth_service: MagicMock,
+    ) -> None:
+        mocked_restart_glauth_service.side_effect = ConfigUpdateTimeoutError("Some reason.")
+        state = create_state(relations=[certificates_relation, db_relation_ready])
+        out = context.run(context.on.config_changed(), state)
+
+        assert out.unit_status == WaitingStatus("Waiting for configuration to be updated")
+        assert out.deferred
+
+    @pytest.mark.parametrize(
+        "config,restart",
+        [
+            ({"failed_binds_max": 5}, False),
+            ({"base_dn": "dc=example,dc=com"}, True),
+        ],
+    )
+    def test_config_update_retried_after_timeout(
+        self,
+        context: Context,
+        certificates_relation: Relation,
+        db_relation_ready: Relation,
+        mocked_tls_certificates: MagicMock,
+        mocked_restart_glauth_service: MagicMock,
+        config: dict,
+        restart: bool,
+    ) -> None:
+        state = create_state(relations=[certificates_relation, db_relation_ready])
+        out = context.run(context.on.config_changed(), state)
+
+        mocked_restart_glauth_service.side_effect = ConfigUpdateTimeoutError("Some reason.")
+        out = context.run(context.on.config_changed(), replace(out, config=config))
+        assert out.deferred
+        mocked_restart_glauth_service.assert_called_with(restart=restart)
+
+        # The retried update restarts only when the change requires it
+        mocked_restart_glauth_service.side_effect = None
+        out = context.run(context.on.update_status(), out)
+
+        assert out.unit_status == ActiveStatus()
+        mocked_restart_glauth_service.assert_called_with(restart=restart)
+
     def test_enable_ldaps_changed_event(
         self,
         context: Context,
@@ -341,6 +669,80 @@ class TestLdapRequestedEvent:
         assert LDAPS_PROVIDER_DATA.model_dump() == actual
 
 
+class TestLeaderElectedEvent:
+    def test_when_database_not_created(
+        self,
+        context: Context,
+        db_relation: Relation,
+        ldap_relation_with_data: Relation,
+        mocked_ldap_integration: MagicMock,
+    ) -> None:
+        state = create_state(relations=[db_relation, ldap_relation_with_data])
+        out = context.run(context.on.leader_elected(), state)
+
+        assert out.unit_status == WaitingStatus("Waiting for database creation")
+        mocked_ldap_integration.load_bind_accounts.assert_not_called()
+
+    def test_on_leader_elected(
+        self,
+        context: Context,
+        db_relation_ready: Relation,
+        ldap_relation_with_data: Relation,
+        mocked_ldap_integration: MagicMock,
+    ) -> None:
+        mocked_ldap_integration.load_bind_accounts.return_value = {
+            ldap_relation_with_data.id: LDAP_PROVIDER_DATA
+        }
+        state = create_state(relations=[db_relation_ready, ldap_relation_with_data])
+        out = context.run(context.on.leader_elected(), state)
+
+        mocked_ldap_integration.load_bind_accounts.assert_called_once_with([
+            BindAccountRequest("user", "group", ldap_relation_with_data.id)
+        ])
+        actual = out.get_relation(ldap_relation_with_data.id).local_app_data
+        assert LDAP_PROVIDER_DATA.model_dump() == actual
+
+    def test_without_ldap_relations(
+        self,
+        context: Context,
+        ldap_client_relation_ready: Relation,
+        ldap_client_bind_password_secret: MagicMock,
+        mocked_ldap_integration: MagicMock,
+    ) -> None:
+        state = create_state(
+            relations=[ldap_client_relation_ready], secrets=[ldap_client_bind_password_secret]
+        )
+        out = context.run(context.on.leader_elected(), state)
+
+        assert out.unit_status != WaitingStatus("Waiting for database creation")
+        assert not out.deferred
+        mocked_ldap_integration.load_bind_accounts.assert_not_called()
+
+    def test_in_ldap_proxy_mode(
+        self,
+        context: Context,
+        ldap_client_relation_ready: Relation,
+        ldap_client_bind_password_secret: MagicMock,
+        ldap_relation_with_data: Relation,
+        mocked_ldap_integration: MagicMock,
+    ) -> None:
+        mocked_ldap_integration.load_bind_accounts.return_value = {
+            ldap_relation_with_data.id: LDAP_PROVIDER_DATA
+        }
+        state = create_state(
+            relations=[ldap_client_relation_ready, ldap_relation_with_data],
+            secrets=[ldap_client_bind_password_secret],
+        )
+        out = context.run(context.on.leader_elected(), state)
+
+        assert not out.deferred
+        mocked_ldap_integration.load_bind_accounts.assert_called_once_with([
+            BindAccountRequest("user", "group", ldap_relation_with_data.id)
+        ])
+        actual = out.get_relation(ldap_relation_with_data.id).local_app_data
+        assert LDAP_PROVIDER_DATA.model_dump() == actual
+
+
 class TestLdapReadyEvent:
     def test_when_requirer_data_not_ready(
         self,
@@ -370,6 +772,56 @@ class TestLdapReadyEvent:
 
         assert out.unit_status == ActiveStatus()
 
+    def test_when_multiple_ldap_servers_ready(
+        self,
+        context: Context,
+        certificates_relation: Relation,
+        mocked_tls_certificates: MagicMock,
+        mocked_configmap: MagicMock,
+        ldap_client_relation_ready: Relation,
+        ldap_client_bind_password_secret: MagicMock,
+    ) -> None:
+        another_ldap_client_relation = replace(
+            ldap_client_relation_ready,
+            id=ldap_client_relation_ready.id + 100,
+            remote_app_name="another-ldap-server",
+            remote_app_data={
+                **ldap_client_relation_ready.remote_app_data,
+                "urls": '["ldap://another.glauth.com"]',
+            },
+        )
+        state = create_state(
+            relations=[
+                certificates_relation,
+                ldap_client_relation_ready,
+                another_ldap_client_relation,
+            ],
+            secrets=[ldap_client_bind_password_secret],
+        )
+        out = context.run(context.on.relation_changed(another_ldap_client_relation), state)
+
+        assert out.unit_status == ActiveStatus()
+        content = mocked_configmap.patch.call_args.args[0]["glauth.cfg"]
+        assert 'servers = ["ldap://ldap.glauth.com", "ldap://another.glauth.com"]' in content
+
+    def test_ldap_servers_loaded_once_per_dispatch(
+        self,
+        context: Context,
+        certificates_relation: Relation,
+        mocked_tls_certificates: MagicMock,
+        ldap_client_relation_ready: Relation,
+        ldap_client_bind_password_secret: MagicMock,
+    ) -> None:
+        state = create_state(
+            relations=[certificates_relation, ldap_client_relation_ready],
+            secrets=[ldap_client_bind_password_secret],
+        )
+        with patch("charm.LdapServerConfig.load", wraps=LdapServerConfig.load) as mocked_load:
+            out = context.run(context.on.relation_changed(ldap_client_relation_ready), state)
+
+        assert out.unit_status == ActiveStatus()
+        mocked_load.assert_called_once()
+
 
 class TestLdapAuxiliaryRequestedEvent:
     def test_when_database_not_created(
@@ -408,6 +860,209 @@ class TestLdapAuxiliaryRequestedEvent:
         assert local_data["password"] == DB_PASSWORD
 
 
+class TestPeerRelationEvent:
+    @pytest.mark.parametrize(
+        "config,urls",
+        [
+            ({}, ["ldap://glauth-k8s.test.svc.cluster.local:3893"]),
+            (
+                {"ldap_address_mode": "unit"},
+                [
+                    "ldap://glauth-k8s-0.glauth-k8s-endpoints.test.svc.cluster.local:3893",
+                    "ldap://glauth-k8s-1.glauth-k8s-endpoints.test.svc.cluster.local:3893",
+                ],
+            ),
+        ],
+    )
+    def test_on_peer_units_changed(
+        self,
+        context: Context,
+        ldap_relation: Relation,
+        config: dict,
+        urls: list[str],
+    ) -> None:
+        peer_relation = PeerRelation(PEER_INTEGRATION_NAME, peers_data={1: {}})
+        state = replace(
+            create_state(relations=[peer_relation, ldap_relation], config=config),
+            model=Model(name="test"),
+            planned_units=2,
+        )
+        out = context.run(context.on.relation_joined(peer_relation, remote_unit=1), state)
+
+        actual = out.get_relation(ldap_relation.id).local_app_data
+        assert json.loads(actual["urls"]) == urls
+
+
+class TestPeerConfig:
+    def test_leader_publishes_config(
+        self,
+        context: Context,
+        certificates_relation: Relation,
+        db_relation_ready: Relation,
+        mocked_tls_certificates: MagicMock,
+    ) -> None:
+        peer_relation = PeerRelation(PEER_INTEGRATION_NAME)
+        state = create_state(relations=[certificates_relation, db_relation_ready, peer_relation])
+        out = context.run(context.on.config_changed(), state)
+
+        peer_config = out.get_relation(peer_relation.id).local_app_data
+        assert peer_config["config-digest"]
+        assert peer_config["config-revision"] == "1"
+
+    def test_follower_skips_rendering(
+        self,
+        context: Context,
+        mocker: MagicMock,
+        certificates_relation: Relation,
+        db_relation_ready: Relation,
+        mocked_tls_certificates: MagicMock,
+        mocked_restart_glauth_service: MagicMock,
+        mocked_configmap: MagicMock,
+    ) -> None:
+        mocked_render = mocker.patch("charm.ConfigFile.render")
+        peer_relation = PeerRelation(
+            PEER_INTEGRATION_NAME,
+            local_app_data={
+                "config-digest": "0123456789abcdef0123456789abcdef",
+                "config-revision": "1",
+                "restart-fingerprint": "fingerprint",
+            },
+            peers_data={1: {}},
+        )
+        state = create_state(
+            leader=False, relations=[certificates_relation, db_relation_ready, peer_relation]
+        )
+        with context(context.on.relation_changed(peer_relation, remote_unit=1), state) as mgr:
+            out = mgr.run()
+            config_digest = mgr.charm.config_digest
+
+        assert out.unit_status == ActiveStatus()
+        assert config_digest == "0123456789abcdef0123456789abcdef"
+        mocked_render.assert_not_called()
+        mocked_configmap.patch.assert_not_called()
+        mocked_restart_glauth_service.assert_called_once_with(restart=True)
+
+
+class TestRollingRestart:
+    def test_leader_grants_restart(self, context: Context) -> None:
+        peer_relation = PeerRelation(
+            PEER_INTEGRATION_NAME, peers_data={1: {"restart-requested": "now"}}
+        )
+        state = create_state(relations=[peer_relation])
+        out = context.run(context.on.relation_changed(peer_relation, remote_unit=1), state)
+
+        assert out.get_relation(peer_relation.id).local_app_data == {
+            "restart-granted": "glauth-k8s/1"
+        }
+
+    def test_leader_keeps_restart_granted(self, context: Context) -> None:
+        peer_relation = PeerRelation(
+            PEER_INTEGRATION_NAME,
+            local_app_data={"restart-granted": "glauth-k8s/2"},
+            peers_data={1: {"restart-requested": "now"}, 2: {"restart-requested": "now"}},
+        )
+        state = create_state(relations=[peer_relation])
+        out = context.run(context.on.relation_changed(peer_relation, remote_unit=1), state)
+
+        assert out.get_relation(peer_relation.id).local_app_data == {
+            "restart-granted": "glauth-k8s/2"
+        }
+
+    def test_unit_restarts_when_granted(
+        self,
+        context: Context,
+        certificates_relation: Relation,
+        db_relation_ready: Relation,
+        mocked_tls_certificates: MagicMock,
+        mocked_restart_glauth_service: MagicMock,
+    ) -> None:
+        peer_relation = PeerRelation(
+            PEER_INTEGRATION_NAME,
+            local_app_data={"restart-granted": "glauth-k8s/0"},
+            local_unit_data={"restart-requested": "now"},
+            peers_data={1: {}},
+        )
+        state = create_state(
+            leader=False, relations=[certificates_relation, db_relation_ready, peer_relation]
+        )
+        out = context.run(context.on.relation_changed(peer_relation, remote_unit=1), state)
+
+        assert out.unit_status == ActiveStatus()
+        assert "restart-requested" not in out.get_relation(peer_relation.id).local_unit_data
+        mocked_restart_glauth_service.assert_called_once_with(restart=True)
+
+    def test_unit_waits_for_restart_turn(
+        self,
+        context: Context,
+        mocker: MagicMock,
+        certificates_relation: Relation,
+        db_relation_ready: Relation,
+        mocked_tls_certificates: MagicMock,
+        mocked_restart_glauth_service: MagicMock,
+        csr: CertificateSigningRequest,
+        certificate: Certificate,
+    ) -> None:
+        peer_relation = PeerRelation(PEER_INTEGRATION_NAME, peers_data={1: {}})
+        state = create_state(
+            leader=False, relations=[certificates_relation, db_relation_ready, peer_relation]
+        )
+        with context(context.on.config_changed(), state) as mgr:
+            mgr.charm._stored.restart_fingerprint = mgr.charm.config_file.restart_fingerprint
+            mocker.patch.object(
+                mgr.charm._certs_integration, "stale_certificates", return_value={SERVER_CERT}
+            )
+            mocker.patch.object(mgr.charm._certs_integration, "update_certificates")
+            mgr.charm._certs_integration.cert_requirer.on.certificate_available.emit(
+                certificate,
+                csr,
+                certificate,
+                [certificate],
+            )
+            restart_call = mocked_restart_glauth_service.call_args
+            unit_data = dict(
+                mgr.charm.model.get_relation(PEER_INTEGRATION_NAME).data[mgr.charm.unit]
+            )
+
+        assert restart_call == call(restart=False)
+        assert "restart-requested" in unit_data
+
+    def test_leader_restarts_in_turn(
+        self,
+        context: Context,
+        mocker: MagicMock,
+        certificates_relation: Relation,
+        db_relation_ready: Relation,
+        mocked_tls_certificates: MagicMock,
+        mocked_restart_glauth_service: MagicMock,
+        csr: CertificateSigningRequest,
+        certificate: Certificate,
+    ) -> None:
+        peer_relation = PeerRelation(PEER_INTEGRATION_NAME, peers_data={1: {}})
+        state = create_state(relations=[certificates_relation, db_relation_ready, peer_relation])
+        with context(context.on.config_changed(), state) as mgr:
+            mgr.charm._stored.restart_fingerprint = mgr.charm.config_file.restart_fingerprint
+            mocker.patch.object(
+                mgr.charm._certs_integration, "stale_certificates", return_value={SERVER_CERT}
+            )
+            mocker.patch.object(mgr.charm._certs_integration, "update_certificates")
+            mgr.charm._certs_integration.cert_requirer.on.certificate_available.emit(
+                certificate,
+                csr,
+                certificate,
+                [certificate],
+            )
+            restart_call = mocked_restart_glauth_service.call_args
+            relation = mgr.charm.model.get_relation(PEER_INTEGRATION_NAME)
+            unit_data, app_data = (
+                dict(relation.data[mgr.charm.unit]),
+                dict(relation.data[mgr.charm.app]),
+            )
+
+        assert restart_call == call(restart=True)
+        assert "restart-requested" not in unit_data
+        assert "restart-granted" not in app_data
+
+
 class TestCertChangedEvent:
     def test_when_container_not_connected(
         self,
@@ -465,8 +1120,19 @@ class TestCertChangedEvent:
         mock_update.assert_called_once()
         mock_transfer.assert_not_called()
 
+    @pytest.mark.parametrize(
+        "changed_files, restart",
+        [
+            ({SERVER_CERT}, True),
+            ({SERVER_KEY, SERVER_CERT}, True),
+            ({SERVER_CA_CERT}, False),
+            (set(), False),
+        ],
+    )
     def test_on_cert_changed(
         self,
+        changed_files: set,
+        restart: bool,
         context: Context,
         mocker: MagicMock,
         mocked_tls_certificates: MagicMock,
@@ -479,9 +1145,17 @@ class TestCertChangedEvent:
         # Provide the relations needed so _handle_event_update doesn't defer.
         state = create_state(relations=[certificates_relation, db_relation_ready])
         with context(context.on.config_changed(), state) as mgr:
+            # The configuration is already applied, only the certificates change
+            mgr.charm._stored.restart_fingerprint = mgr.charm.config_file.restart_fingerprint
+            mocker.patch.object(
+                mgr.charm._certs_integration,
+                "stale_certificates",
+                return_value=changed_files,
+            )
             mock_update = mocker.patch.object(
                 mgr.charm._certs_integration,
                 "update_certificates",
+                return_value=changed_files,
             )
             mock_transfer = mocker.patch.object(
                 mgr.charm._certs_transfer_integration,
@@ -493,10 +1167,55 @@ class TestCertChangedEvent:
                 certificate,
                 [certificate],
             )
+            restart_call = mocked_restart_glauth_service.call_args
 
         mock_update.assert_called_once()
         mock_transfer.assert_called_once()
-        mocked_restart_glauth_service.assert_called_with(restart=True)
+        assert restart_call == call(restart=restart)
+
+    def test_restart_kept_when_event_deferred(
+        self,
+        context: Context,
+        mocker: MagicMock,
+        mocked_tls_certificates: MagicMock,
+        mocked_restart_glauth_service: MagicMock,
+        certificates_relation: Relation,
+        db_relation: Relation,
+        db_relation_ready: Relation,
+        csr: CertificateSigningRequest,
+        certificate: Certificate,
+    ) -> None:
+        state = create_state(relations=[certificates_relation, db_relation])
+        with context(context.on.update_status(), state) as mgr:
+            mocker.patch.object(
+                mgr.charm._certs_integration, "stale_certificates", return_value={SERVER_CERT}
+            )
+            mocker.patch.object(mgr.charm._certs_integration, "update_certificates")
+            mocker.patch.object(mgr.charm._certs_transfer_integration, "transfer_certificates")
+            mgr.charm._certs_integration.cert_requirer.on.certificate_available.emit(
+                certificate,
+                csr,
+                certificate,
+                [certificate],
+            )
+            out = mgr.run()
+
+        mocked_restart_glauth_service.assert_not_called()
+
+        # The deferred event is retried with the pushed certificates up to date
+        state = replace(out, relations=[certificates_relation, db_relation_ready])
+        with context(context.on.update_status(), state) as mgr:
+            mgr.charm._stored.restart_fingerprint = mgr.charm.config_file.restart_fingerprint
+            mocker.patch.object(
+                mgr.charm._certs_integration, "stale_certificates", return_value=set()
+            )
+            mocker.patch.object(mgr.charm._certs_integration, "update_certificates")
+            mocker.patch.object(mgr.charm._certs_transfer_integration, "transfer_certificates")
+            out = mgr.run()
+
+        stored = charm_stored_state(out)
+        mocked_restart_glauth_service.assert_called_once_with(restart=True)
+        assert stored["restart_required"] is False
 
 
 class TestCertificatesTransferEvent:
@@ -530,3 +1249,48 @@ class TestCertificatesTransferEvent:
             mgr.run()
 
         mock_transfer.assert_called_once()
+
+    def test_skip_unchanged_certificates_transfer(
+        self,
+        context: Context,
+        mocker: MagicMock,
+        certificates_transfer_relation: Relation,
+    ) -> None:
+        another_relation = Relation(CERTIFICATES_TRANSFER_INTEGRATION_NAME)
+        state = create_state(relations=[certificates_transfer_relation, another_relation])
+        data = CertificateData(ca_cert="ca", ca_chain=["ca"], cert="cert")
+        with context(context.on.update_status(), state) as mgr:
+            integration = mgr.charm._certs_transfer_integration
+            mocked_set_certificate = mocker.spy(
+                integration._certs_transfer_provider, "set_certificate"
+            )
+            integration.transfer_certificates(data)
+            integration.transfer_certificates(data)
+            integration.transfer_certificates(replace(data, cert="new-cert"))
+
+        assert mocked_set_certificate.call_count == 4
+        assert {call.kwargs["certificate"] for call in mocked_set_certificate.call_args_list} == {
+            "cert",
+            "new-cert",
+        }
+
+    def test_skip_certificates_transferred_earlier(
+        self,
+        context: Context,
+        mocker: MagicMock,
+        certificates_transfer_relation: Relation,
+    ) -> None:
+        relation = replace(
+            certificates_transfer_relation,
+            local_unit_data={"certificate": "cert", "ca": "ca", "chain": '["ca"]', "version": "0"},
+        )
+        state = create_state(relations=[relation])
+        data = CertificateData(ca_cert="ca", ca_chain=["ca"], cert="cert")
+        with context(context.on.update_status(), state) as mgr:
+            integration = mgr.charm._certs_transfer_integration
+            mocked_set_certificate = mocker.spy(
+                integration._certs_transfer_provider, "set_certificate"
+            )
+            integration.transfer_certificates(data)
+
+        mocked_set_certificate.assert_not_called()
@@ -0,0 +1,182 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import os
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from conftest import LDAP_PROVIDER_DATA
+
+from configs import (
+    BehaviorsConfig,
+    ConfigFile,
+    ConfigFileData,
+    DatabaseConfig,
+    LdapsConfig,
+    LdapServerConfig,
+    StartTLSConfig,
+    load_template,
+)
+
+
+class TestLoadTemplate:
+    def test_template_reused_when_unchanged(self, tmp_path: Path) -> None:
+        path = tmp_path / "test.j2"
+        path.write_text("{{ value }}")
+
+        template = load_template(path)
+
+        assert load_template(path) is template
+        assert template.render(value="abc") == "abc"
+
+    def test_template_reloaded_when_changed(self, tmp_path: Path) -> None:
+        path = tmp_path / "test.j2"
+        path.write_text("{{ value }}")
+        template = load_template(path)
+
+        path.write_text("changed {{ value }}")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        assert load_template(path) is not template
+        assert load_template(path).render(value="abc") == "changed abc"
+
+    def test_template_bytecode_cache(self, tmp_path: Path) -> None:
+        path = tmp_path / "test.j2"
+        path.write_text("{{ value }}")
+        cache_dir = tmp_path / "cache"
+
+        load_template(path, bytecode_cache_dir=cache_dir)
+
+        assert any(cache_dir.iterdir())
+
+
+class TestBehaviorsConfig:
+    def test_default_preset(self) -> None:
+        assert BehaviorsConfig.load({}) == BehaviorsConfig()
+
+    def test_high_throughput_preset(self) -> None:
+        behaviors = BehaviorsConfig.load({"behaviors_preset": "high-throughput"})
+
+        assert behaviors.number_of_failed_binds == 10
+        assert behaviors.prune_source_table_every == 60
+
+    def test_options_override_preset(self) -> None:
+        behaviors = BehaviorsConfig.load({
+            "behaviors_preset": "high-throughput",
+            "failed_binds_max": 5,
+            "failed_binds_limit_enabled": False,
+        })
+
+        assert behaviors.number_of_failed_binds == 5
+        assert behaviors.limit_failed_binds is False
+        assert behaviors.prune_source_table_every == 60
+
+    @pytest.mark.parametrize(
+        "config",
+        [
+            {"behaviors_preset": "unknown"},
+            {"failed_binds_max": 0},
+            {"failed_binds_period": 60, "source_table_max_age": 30},
+        ],
+    )
+    def test_invalid_config(self, config: dict) -> None:
+        assert BehaviorsConfig.validate(config)
+
+    def test_valid_config(self) -> None:
+        assert BehaviorsConfig.validate({"behaviors_preset": "high-throughput"}) is None
+
+
+@pytest.fixture
+def database_requirer() -> MagicMock:
+    requirer = MagicMock()
+    requirer.relations = [MagicMock(id=1)]
+    requirer.database = "glauth"
+    requirer.fetch_relation_data.return_value = {
+        1: {
+            "endpoints": "primary:5432",
+            "read-only-endpoints": "replica-0:5432,replica-1:5432",
+            "username": "username",
+            "password": "password",
+        }
+    }
+    return requirer
+
+
+class TestLdapServerConfig:
+    def test_pooled_ldap_servers(self) -> None:
+        ldap_servers_config = LdapServerConfig([
+            LDAP_PROVIDER_DATA.model_copy(update={"urls": ["ldap://ldap-0", "ldap://ldap-1"]}),
+            LDAP_PROVIDER_DATA.model_copy(update={"urls": ["ldap://ldap-1", "ldap://ldap-2"]}),
+        ])
+        content = ConfigFile(
+            ConfigFileData(
+                ldap_servers_config=ldap_servers_config,
+                starttls_config=StartTLSConfig(),
+                ldaps_config=LdapsConfig(),
+            )
+        ).render()
+
+        assert ldap_servers_config.ldap_server == ldap_servers_config.ldap_servers[0]
+        assert 'servers = ["ldap://ldap-0", "ldap://ldap-1", "ldap://ldap-2"]' in content
+
+    def test_load_pools_servers_sharing_bind_account(self) -> None:
+        requirer = MagicMock()
+        requirer.relations = [MagicMock(id=3), MagicMock(id=1), MagicMock(id=2)]
+        ldap_servers = {
+            1: LDAP_PROVIDER_DATA.model_copy(update={"urls": ["ldap://ldap-1"]}),
+            2: LDAP_PROVIDER_DATA.model_copy(
+                update={"urls": ["ldap://ldap-2"], "bind_dn": "cn=other,ou=other,dc=other"}
+            ),
+            3: LDAP_PROVIDER_DATA.model_copy(update={"urls": ["ldap://ldap-3"]}),
+        }
+        requirer.consume_ldap_relation_data.side_effect = lambda relation: ldap_servers[
+            relation.id
+        ]
+
+        ldap_servers_config = LdapServerConfig.load(requirer)
+
+        assert ldap_servers_config.ldap_server == ldap_servers[1]
+        assert ldap_servers_config.urls == ["ldap://ldap-1", "ldap://ldap-3"]
+
+
+class TestDatabaseConfig:
+    def test_read_replicas_disabled(self, database_requirer: MagicMock) -> None:
+        database_config = DatabaseConfig.load(database_requirer, {})
+
+        assert database_config and database_config.read_endpoint == "primary:5432"
+
+    def test_read_replicas_enabled(self, database_requirer: MagicMock) -> None:
+        database_config = DatabaseConfig.load(
+            database_requirer, {"database_read_replicas_enabled": True}
+        )
+
+        assert database_config
+        assert database_config.read_endpoint == "replica-0:5432"
+        assert "@primary:5432/" in database_config.dsn
+
+    def test_connect_timeout(self) -> None:
+        database_config = DatabaseConfig(
+            endpoint="postgresql:5432",
+            database="glauth",
+            username="username",
+            password="password",
+            connect_timeout=5,
+        )
+        content = ConfigFile(
+            ConfigFileData(
+                database_config=database_config,
+                starttls_config=StartTLSConfig(),
+                ldaps_config=LdapsConfig(),
+            )
+        ).render()
+
+        assert database_config.dsn.endswith("/glauth?connect_timeout=5")
+        assert "/glauth?sslmode=disable&connect_timeout=5" in content
+
+    @pytest.mark.parametrize("connect_timeout,valid", [(None, True), (5, True), (0, False)])
+    def test_validate(self, connect_timeout: int, valid: bool) -> None:
+        msg = DatabaseConfig.validate({"database_connect_timeout": connect_timeout})
+
+        assert (msg is None) is valid
@@ -0,0 +1,29 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from database import EngineRegistry
+
+
+class TestEngineRegistry:
+    def test_engine_reused_for_same_dsn(self) -> None:
+        registry = EngineRegistry()
+
+        engine = registry.get("sqlite://")
+
+        assert registry.get("sqlite://") is engine
+        assert (registry.hits, registry.misses) == (1, 1)
+
+    def test_engine_per_dsn(self) -> None:
+        registry = EngineRegistry()
+
+        assert registry.get("sqlite://") is not registry.get("sqlite:///:memory:")
+        assert (registry.hits, registry.misses) == (0, 2)
+
+    def test_dispose(self) -> None:
+        registry = EngineRegistry()
+        engine = registry.get("sqlite://")
+
+        registry.dispose()
+
+        assert registry.get("sqlite://") is not engine
+        assert (registry.hits, registry.misses) == (0, 1)
@@ -0,0 +1,245 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import hashlib
+import json
+import logging
+from io import StringIO
+from pathlib import Path
+from typing import Generator
+from unittest.mock import MagicMock, PropertyMock, patch
+
+import pytest
+from ops.pebble import PathError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from constants import CERTIFICATES_DIGEST_FILE, SERVER_CA_CERT, SERVER_CERT, SERVER_KEY
+from database import Base, Capability, Group, Operation, User, engine_registry
+from integrations import (
+    BindAccountRequest,
+    CertificatesIntegration,
+    LdapIntegration,
+    _create_bind_accounts,
+    _reset_account_passwords,
+)
+
+DSN = "sqlite://"
+
+
+@pytest.fixture
+def database() -> Generator[Session, None, None]:
+    engine = engine_registry.get(DSN)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine_registry.dispose()
+
+
+class TestCreateBindAccounts:
+    def test_create_bind_accounts(self, database: Session) -> None:
+        requests = [
+            BindAccountRequest("user-1", "group", 1),
+            BindAccountRequest("user-2", "group", 2),
+        ]
+
+        accounts = _create_bind_accounts(DSN, requests)
+
+        assert accounts.keys() == {1, 2}
+        assert all(account.password for account in accounts.values())
+        assert set(database.scalars(select(User.name))) == {"user-1", "user-2"}
+        assert list(database.scalars(select(Group.name))) == ["group"]
+        assert len(database.scalars(select(Capability)).all()) == 1
+
+    def test_existing_bind_accounts(self, database: Session) -> None:
+        _create_bind_accounts(DSN, [BindAccountRequest("user-1", "group", 1)])
+
+        accounts = _create_bind_accounts(
+            DSN,
+            [
+                BindAccountRequest("user-1", "group", 1),
+                BindAccountRequest("user-2", "group", 2),
+            ],
+        )
+
+        assert not accounts[1].password
+        assert accounts[2].password
+        assert len(database.scalars(select(User)).all()) == 2
+        assert len(database.scalars(select(Capability)).all()) == 1
+
+
+def password_sha256(database: Session, user_name: str) -> str:
+    database.expire_all()
+    return database.scalars(select(User.password_sha256).filter(User.name == user_name)).one()
+
+
+@pytest.fixture
+def ldap_integration() -> LdapIntegration:
+    charm = MagicMock()
+    charm.config = {"base_dn": "dc=glauth,dc=com"}
+    charm.ingress_per_unit.urls = {"glauth-k8s/0": "10.0.0.1:3893"}
+    charm.ldap_servers_config = None
+    charm.database_config.dsn = DSN
+    return LdapIntegration(charm)
+
+
+class TestLoadBindAccounts:
+    def test_reuse_password_from_secret(
+        self, database: Session, ldap_integration: LdapIntegration
+    ) -> None:
+        requests = [BindAccountRequest("user-1", "group", 1)]
+        _create_bind_accounts(DSN, requests)
+        hashed = password_sha256(database, "user-1")
+        ldap_integration._charm.ldap_provider.get_bind_password.return_value = "secret"
+
+        provider_data = ldap_integration.load_bind_accounts(requests)
+
+        assert provider_data[1].bind_password == "secret"
+        assert provider_data[1].bind_dn == "cn=user-1,ou=group,dc=glauth,dc=com"
+        assert password_sha256(database, "user-1") == hashed
+
+    def test_reset_passwords_without_secret(
+        self, database: Session, ldap_integration: LdapIntegration
+    ) -> None:
+        requests = [
+            BindAccountRequest("user-1", "group", 1),
+            BindAccountRequest("user-2", "group", 2),
+        ]
+        _create_bind_accounts(DSN, requests)
+        ldap_integration._charm.ldap_provider.get_bind_password.return_value = None
+
+        with patch("database.Operation", wraps=Operation) as operation:
+            provider_data = ldap_integration.load_bind_accounts(requests)
+
+        # One transaction creates the accounts, a second one resets both passwords
+        assert operation.call_count == 2
+        for relation_id, user_name in ((1, "user-1"), (2, "user-2")):
+            password = provider_data[relation_id].bind_password
+            assert password
+            assert (
+                password_sha256(database, user_name)
+                == hashlib.sha256(password.encode()).hexdigest()
+            )
+
+    def test_reset_passwords_of_missing_users(self, database: Session) -> None:
+        _create_bind_accounts(DSN, [BindAccountRequest("user-1", "group", 1)])
+        hashed = password_sha256(database, "user-1")
+
+        with pytest.raises(RuntimeError, match="No users \\['user-2'\\] found"):
+            _reset_account_passwords(DSN, ["user-1", "user-2"])
+
+        assert password_sha256(database, "user-1") == hashed
+
+
+@pytest.fixture
+def system_bundle(tmp_path: Path) -> Generator[Path, None, None]:
+    bundle = tmp_path / "ca-certificates.crt"
+    bundle.write_text("system-ca\n")
+    with patch("integrations.CERTIFICATE_FILE", bundle):
+        yield bundle
+
+
+@pytest.fixture
+def certs_integration() -> Generator[CertificatesIntegration, None, None]:
+    integration = CertificatesIntegration.__new__(CertificatesIntegration)
+    integration._container = MagicMock()
+    integration._container.pull.side_effect = PathError("not-found", "No such file")
+    integration.pushed_bytes = 0
+    with (
+        patch.object(CertificatesIntegration, "_ca_cert", new_callable=PropertyMock) as ca,
+        patch.object(CertificatesIntegration, "_server_key", new_callable=PropertyMock) as key,
+        patch.object(CertificatesIntegration, "_server_cert", new_callable=PropertyMock) as cert,
+    ):
+        ca.return_value, key.return_value, cert.return_value = "ca", "key", "cert"
+        yield integration
+
+
+def pushed_files(certs_integration: CertificatesIntegration) -> dict[Path, str]:
+    return {
+        call.args[0]: call.args[1] for call in certs_integration._container.push.call_args_list
+    }
+
+
+class TestPushCertificates:
+    def test_push_certificates(
+        self, system_bundle: Path, certs_integration: CertificatesIntegration
+    ) -> None:
+        changed = certs_integration._push_certificates()
+
+        pushed = pushed_files(certs_integration)
+        digests = json.loads(pushed.pop(CERTIFICATES_DIGEST_FILE))
+        assert pushed == {
+            system_bundle: "system-ca\nca\ncert",
+            SERVER_CA_CERT: "ca",
+            SERVER_KEY: "key",
+            SERVER_CERT: "cert",
+        }
+        assert changed == pushed.keys()
+        assert digests.keys() == {str(path) for path in pushed}
+        assert certs_integration.pushed_bytes == sum(len(content) for content in pushed.values())
+        assert system_bundle.read_text() == "system-ca\n"
+
+    def test_skip_unchanged_certificates(
+        self, system_bundle: Path, certs_integration: CertificatesIntegration
+    ) -> None:
+        certs_integration._push_certificates()
+        manifest = pushed_files(certs_integration)[CERTIFICATES_DIGEST_FILE]
+        certs_integration._container.pull.side_effect = None
+        certs_integration._container.pull.return_value = StringIO(manifest)
+        certs_integration._container.push.reset_mock()
+
+        changed = certs_integration._push_certificates()
+
+        assert not changed
+        certs_integration._container.push.assert_not_called()
+
+    def test_push_changed_certificates(
+        self,
+        system_bundle: Path,
+        certs_integration: CertificatesIntegration,
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        certs_integration._push_certificates()
+        first_pushed_bytes = certs_integration.pushed_bytes
+        manifest = pushed_files(certs_integration)[CERTIFICATES_DIGEST_FILE]
+        certs_integration._container.pull.side_effect = None
+        certs_integration._container.pull.return_value = StringIO(manifest)
+        certs_integration._container.push.reset_mock()
+
+        with patch.object(
+            CertificatesIntegration, "_server_cert", new_callable=PropertyMock
+        ) as cert:
+            cert.return_value = "new-cert"
+            with caplog.at_level(logging.INFO):
+                changed = certs_integration._push_certificates()
+
+        pushed = pushed_files(certs_integration)
+        assert changed == {system_bundle, SERVER_CERT}
+        assert pushed.keys() == {
+            system_bundle,
+            SERVER_CERT,
+            CERTIFICATES_DIGEST_FILE,
+        }
+        pushed_bytes = len(pushed[system_bundle]) + len(pushed[SERVER_CERT])
+        assert f"2 certificate file(s), {pushed_bytes} bytes" in caplog.text
+        assert certs_integration.pushed_bytes == first_pushed_bytes + pushed_bytes
+
+    def test_stale_certificates(
+        self, system_bundle: Path, certs_integration: CertificatesIntegration
+    ) -> None:
+        certs_integration._push_certificates()
+        manifest = pushed_files(certs_integration)[CERTIFICATES_DIGEST_FILE]
+        certs_integration._container.pull.side_effect = None
+        certs_integration._container.pull.return_value = StringIO(manifest)
+        certs_integration._container.push.reset_mock()
+        certs_integration._charm = MagicMock()
+
+        with (
+            patch.object(CertificatesIntegration, "certs_ready", return_value=True),
+            patch.object(CertificatesIntegration, "_server_key", new_callable=PropertyMock) as key,
+        ):
+            key.return_value = "new-key"
+            stale = certs_integration.stale_certificates()
+
+        assert stale == {SERVER_KEY}
+        certs_integration._container.push.assert_not_called()
@@ -0,0 +1,71 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from unittest.mock import MagicMock
+
+import pytest
+from lightkube import Client
+from lightkube.core.exceptions import ApiError
+from lightkube.models.meta_v1 import Status
+
+from kubernetes_resource import ConfigMapResource, KubernetesResourceError, StatefulSetResource
+
+
+def api_error(code: int) -> ApiError:
+    return ApiError(request=MagicMock(), status=Status(code=code, message="error"))
+
+
+@pytest.fixture
+def client() -> MagicMock:
+    client = MagicMock(spec=Client)
+    client.namespace = "namespace"
+    return client
+
+
+class TestConfigMapResource:
+    def test_create(self, client: MagicMock) -> None:
+        configmap = ConfigMapResource(client, "glauth-k8s")
+
+        configmap.create()
+
+        client.get.assert_not_called()
+        client.create.assert_called_once()
+
+    def test_create_when_exists(self, client: MagicMock) -> None:
+        client.create.side_effect = api_error(409)
+        configmap = ConfigMapResource(client, "glauth-k8s")
+
+        configmap.create()
+
+        client.create.assert_called_once()
+
+    def test_create_failed(self, client: MagicMock) -> None:
+        client.create.side_effect = api_error(403)
+        configmap = ConfigMapResource(client, "glauth-k8s")
+
+        with pytest.raises(KubernetesResourceError):
+            configmap.create()
+
+    def test_patch(self, client: MagicMock) -> None:
+        configmap = ConfigMapResource(client, "glauth-k8s")
+
+        configmap.patch({"glauth.cfg": "content"})
+
+        client.apply.assert_called_once()
+        manifest = client.apply.call_args.args[0]
+        assert manifest.data == {"glauth.cfg": "content"}
+        assert manifest.metadata.namespace == "namespace"
+        assert "namespace" not in client.apply.call_args.kwargs
+
+
+class TestStatefulSetResource:
+    def test_patch(self, client: MagicMock) -> None:
+        statefulset = StatefulSetResource(client, "glauth-k8s")
+
+        assert statefulset.patch({"spec": {}}) is True
+
+    def test_patch_failed(self, client: MagicMock) -> None:
+        client.patch.side_effect = api_error(422)
+        statefulset = StatefulSetResource(client, "glauth-k8s")
+
+        assert statefulset.patch({"spec": {}}) is False
@@ -0,0 +1,91 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import logging
+from typing import Any
+
+import pytest
+import yaml
+from charms.glauth_k8s.v0.ldap import LdapProvider, LdapProviderBaseData
+from ops import CharmBase
+from ops.testing import Context, Relation, State
+
+METADATA = """
+name: provider-tester
+provides:
+  ldap:
+    interface: ldap
+"""
+
+
+class LdapProviderCharm(CharmBase):
+    """Test charm that wraps LdapProvider."""
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.ldap_provider = LdapProvider(self)
+
+
+@pytest.fixture
+def context() -> Context:
+    """ops.testing Context for the test LdapProviderCharm."""
+    return Context(LdapProviderCharm, meta=yaml.safe_load(METADATA), juju_version="3.2.1")
+
+
+@pytest.fixture
+def provider_data() -> LdapProviderBaseData:
+    """Minimal LDAP provider data."""
+    return LdapProviderBaseData(
+        urls=["ldap://path.to.glauth:3893"],
+        ldaps_urls=["ldaps://path.to.glauth:3894"],
+        base_dn="dc=glauth,dc=com",
+        starttls=True,
+    )
+
+
+def test_skip_unchanged_relation_data(
+    context: Context, provider_data: LdapProviderBaseData, caplog: pytest.LogCaptureFixture
+) -> None:
+    relation = Relation("ldap")
+    state = State(leader=True, relations=[relation])
+
+    with caplog.at_level(logging.DEBUG), context(context.on.update_status(), state) as mgr:
+        ldap_provider = mgr.charm.ldap_provider
+        ldap_provider.update_relations_app_data(provider_data)
+        ldap_provider.update_relations_app_data(provider_data)
+        out = mgr.run()
+
+    assert ldap_provider.skipped_writes == 1
+    assert "Updated the LDAP data in 0 relation(s), skipped writes: 1" in caplog.messages
+    assert out.get_relation(relation.id).local_app_data["base_dn"] == "dc=glauth,dc=com"
+
+
+def test_write_changed_relation_data(
+    context: Context, provider_data: LdapProviderBaseData
+) -> None:
+    relation = Relation("ldap")
+    state = State(leader=True, relations=[relation])
+
+    with context(context.on.update_status(), state) as mgr:
+        ldap_provider = mgr.charm.ldap_provider
+        ldap_provider.update_relations_app_data(provider_data)
+        ldap_provider.update_relations_app_data(
+            provider_data.model_copy(update={"base_dn": "dc=canonical,dc=com"})
+        )
+        out = mgr.run()
+
+    assert ldap_provider.skipped_writes == 0
+    assert out.get_relation(relation.id).local_app_data["base_dn"] == "dc=canonical,dc=com"
+
+
+def test_non_leader_skips_nothing(context: Context, provider_data: LdapProviderBaseData) -> None:
+    relation = Relation("ldap")
+    state = State(leader=False, relations=[relation])
+
+    with context(context.on.update_status(), state) as mgr:
+        ldap_provider = mgr.charm.ldap_provider
+        ldap_provider.update_relations_app_data(provider_data)
+        out = mgr.run()
+
+    assert ldap_provider.skipped_writes == 0
+    assert not out.get_relation(relation.id).local_app_data
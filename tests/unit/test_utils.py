@@ -1,22 +1,28 @@
 # Copyright 2023 Canonical Ltd.
 # See LICENSE file for licensing details.
 
+import hashlib
 from io import StringIO
 from unittest.mock import MagicMock, PropertyMock, patch, sentinel
 
+import pytest
 from conftest import create_state
 from ops.charm import CharmBase, HookEvent
 from ops.model import ActiveStatus, BlockedStatus, WaitingStatus
 from ops.testing import Container, Context
 
 from constants import DATABASE_INTEGRATION_NAME, WORKLOAD_CONTAINER
+from exceptions import ConfigUpdateTimeoutError
 from utils import (
     after_config_updated,
     block_when,
     container_not_connected,
     database_not_ready,
+    evaluate,
     integration_not_exists,
     leader_unit,
+    reset_conditions,
+    service_not_ready,
     tls_certificates_not_ready,
     wait_when,
 )
@@ -152,6 +158,45 @@ class TestConditions:
 
         assert result is sentinel
 
+    def test_evaluate_once_per_dispatch(self, context: Context) -> None:
+        state = create_state()
+        condition = MagicMock(return_value=(False, ""))
+
+        with context(context.on.config_changed(), state) as mgr:
+            mgr.run()
+            evaluate(mgr.charm, condition)
+            evaluate(mgr.charm, condition)
+
+        condition.assert_called_once_with(mgr.charm)
+
+    def test_reset_conditions(self, context: Context) -> None:
+        state = create_state()
+        condition = MagicMock(return_value=(False, ""))
+
+        with context(context.on.config_changed(), state) as mgr:
+            mgr.run()
+            evaluate(mgr.charm, condition)
+            reset_conditions(mgr.charm)
+            evaluate(mgr.charm, condition)
+
+        assert condition.call_count == 2
+
+    def test_service_not_ready_reuses_connection_check(self, context: Context) -> None:
+        container = Container(WORKLOAD_CONTAINER, can_connect=False)
+        state = create_state(containers=[container])
+
+        with context(context.on.config_changed(), state) as mgr:
+            mgr.run()
+            reset_conditions(mgr.charm)
+            with patch.object(
+                mgr.charm._container, "can_connect", return_value=False
+            ) as mocked_can_connect:
+                evaluate(mgr.charm, container_not_connected)
+                res, msg = service_not_ready(mgr.charm)
+
+        assert res is True and msg
+        mocked_can_connect.assert_called_once()
+
 
 class TestUtils:
     def test_leader_unit(self, context: Context) -> None:
@@ -180,7 +225,7 @@ class TestUtils:
 
         assert result is None
 
-    @patch("ops.model.Container.pull", return_value=StringIO("abc"))
+    @patch("ops.model.Container.pull", return_value=StringIO(hashlib.md5(b"abc").hexdigest()))
     @patch("charm.ConfigFile.content", new_callable=PropertyMock, return_value="abc")
     def test_after_config_updated(
         self,
@@ -189,9 +234,8 @@ class TestUtils:
         context: Context,
         mocked_configmap: MagicMock,
     ) -> None:
-        # Make fetch_cm() return the same string as what Container.pull() returns
+        # Make Container.pull() return the digest of the rendered config
         # so the retry loop in after_config_updated exits immediately.
-        mocked_configmap.get.return_value.data = {"glauth.cfg": "abc"}
         state = create_state()
         fake_event = MagicMock(spec=HookEvent)
 
@@ -208,3 +252,24 @@ class TestUtils:
 
         assert result is sentinel
         assert isinstance(mgr.charm.unit.status, ActiveStatus)
+        mocked_configmap.get.assert_not_called()
+
+    @patch("utils.GLAUTH_CONFIG_UPDATE_TIMEOUT", 0)
+    @patch("ops.model.Container.pull", return_value=StringIO("abc"))
+    def test_after_config_updated_timeout(
+        self,
+        mocked_container_pull: MagicMock,
+        context: Context,
+    ) -> None:
+        state = create_state()
+        fake_event = MagicMock(spec=HookEvent)
+
+        @after_config_updated
+        def wrapped(charm: CharmBase, event: HookEvent) -> object:
+            return sentinel
+
+        with context(context.on.config_changed(), state) as mgr:
+            mgr.run()
+            mgr.charm.config_changed = True
+            with pytest.raises(ConfigUpdateTimeoutError):
+                wrapped(mgr.charm, fake_event)